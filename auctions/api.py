@@ -0,0 +1,380 @@
+import hashlib
+from datetime import datetime, timedelta
+from datetime import timezone as datetime_timezone
+
+from django.db.models import F, Q
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import condition, require_safe
+
+from .models import Auction, Bid, Comment
+from .pagination import fetch_page, split_page
+from .shards import group_by_shard
+
+API_PAGE_SIZE = 100
+
+CHANGE_FIELDS = (
+    "creation_date",
+    "end_date",
+    "last_bid_at",
+    "last_comment_at",
+    "closed_at",
+)
+SUMMARY_FIELDS = (
+    "id",
+    "title",
+    "image",
+    "category",
+    "price",
+    "status",
+    "bid_count",
+) + CHANGE_FIELDS
+DETAIL_FIELDS = SUMMARY_FIELDS + ("description", "winner")
+STATE_FIELDS = ("id", "price", "bid_count", "status", "end_date")
+STATE_MAX_IDS = 500
+# A since token lags behind the clock, so a bid dated before a poll but
+# committed after it is sent by the next poll
+STATE_LAG = timedelta(seconds=2)
+
+
+def last_modified(row, current=None):
+    """
+    Return the date of the last change of an auction
+
+    Parameters
+    ----------
+    row: dict
+        values() of an Auction with the CHANGE_FIELDS
+    current: datetime
+        The current date, timezone.now() if None
+
+    Return
+    ------
+    date: datetime
+        The latest of its creation, last bid, last comment, closure and
+        end date once passed
+    """
+    current = current or timezone.now()
+    dates = [row[field] for field in CHANGE_FIELDS if field != "end_date"]
+    if row["end_date"] <= current:
+        dates.append(row["end_date"])
+    return max(date for date in dates if date is not None)
+
+
+def make_etag(*parts):
+    """
+    Return a strong entity tag from the parts identifying a representation
+    """
+    return hashlib.sha1("|".join(map(str, parts)).encode()).hexdigest()
+
+
+def row_version(row):
+    """
+    Return every value of a values() row, so any edit changes the ETag
+    """
+    return ",".join(f"{field}={row[field]}" for field in sorted(row))
+
+
+def get_auction_row(request, auction_id):
+    """
+    Return the values() of an auction, read once per request
+
+    The conditional checks and the view share the row, a 304 costs a
+    single query
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request
+    auction_id: int
+        Represent id of an Auction object
+
+    Return
+    ------
+    None: NoneType
+        if the auction does not exist
+    row: dict
+        The DETAIL_FIELDS, the seller and winner usernames
+    """
+    if not hasattr(request, "auction_row"):
+        request.auction_row = (
+            Auction.objects.filter(pk=auction_id)
+            .values(
+                *DETAIL_FIELDS,
+                seller=F("user__username"),
+                winner_name=F("winner__username"),
+            )
+            .first()
+        )
+    return request.auction_row
+
+
+def auction_etag(request, auction_id, **kwargs):
+    """
+    Return the ETag of an auction and of its bids and comments pages
+
+    Built from every value of the row, whose last_bid_at and last_comment_at
+    change with the bids and comments
+    """
+    row = get_auction_row(request, auction_id)
+    if row is None:
+        return None
+    return make_etag(row_version(row))
+
+
+def auction_last_modified(request, auction_id, **kwargs):
+    row = get_auction_row(request, auction_id)
+    if row is None:
+        return None
+    return last_modified(row)
+
+
+def get_listing_page(request):
+    """
+    Return one page of active auctions as values(), read once per request
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request, with the optional after cursor and
+        category
+
+    Return
+    ------
+    tuple: list, str
+        list: the values() of the auctions of the page
+        str: the cursor of the next page, None if it is the last one
+    """
+    if not hasattr(request, "listing_page"):
+        queryset = Auction.objects.active()
+        if request.GET.get("category"):
+            queryset = queryset.filter(category=request.GET["category"])
+        queryset = queryset.values(*SUMMARY_FIELDS, seller=F("user__username"))
+        request.listing_page = split_page(
+            fetch_page(queryset, request.GET.get("after"))
+        )
+    return request.listing_page
+
+
+def listing_etag(request):
+    rows, cursor = get_listing_page(request)
+    return make_etag(cursor, *map(row_version, rows))
+
+
+def listing_last_modified(request):
+    rows, _ = get_listing_page(request)
+    current = timezone.now()
+    return max((last_modified(row, current) for row in rows), default=None)
+
+
+def get_page_number(request):
+    try:
+        return max(int(request.GET.get("page", 1)), 1)
+    except ValueError:
+        return 1
+
+
+@require_safe
+@condition(etag_func=listing_etag, last_modified_func=listing_last_modified)
+def auction_list(request):
+    """
+    Return one page of active auctions, ordered by end date
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request
+
+    Return
+    ------
+    JsonResponse(): JsonResponse
+        auctions: list of auction summaries
+        next: cursor of the next page to pass as after, null on the last page
+    """
+    rows, cursor = get_listing_page(request)
+    return JsonResponse({"auctions": rows, "next": cursor})
+
+
+@require_safe
+@condition(etag_func=auction_etag, last_modified_func=auction_last_modified)
+def auction_detail(request, auction_id):
+    """
+    Return an auction
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request
+    auction_id: int
+        Represent id of an Auction object
+
+    Return
+    ------
+    JsonResponse(): JsonResponse
+        The auction fields, the seller and winner usernames
+    """
+    row = get_auction_row(request, auction_id)
+    if row is None:
+        raise Http404("No Auction matches the given query.")
+    return JsonResponse(row)
+
+
+@require_safe
+@condition(etag_func=auction_etag, last_modified_func=auction_last_modified)
+def auction_bids(request, auction_id):
+    """
+    Return one page of the bids of an auction, the highest first
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request, with the optional page number
+    auction_id: int
+        Represent id of an Auction object
+
+    Return
+    ------
+    JsonResponse(): JsonResponse
+        bids: list of bids with the bidder username
+        has_next: true if there is a next page
+    """
+    if get_auction_row(request, auction_id) is None:
+        raise Http404("No Auction matches the given query.")
+    offset = (get_page_number(request) - 1) * API_PAGE_SIZE
+    bids = list(
+        Bid.objects.filter(auction_id=auction_id)
+        .order_by("-price", "auction_date")
+        .values("id", "price", "auction_date", bidder=F("user__username"))[
+            offset : offset + API_PAGE_SIZE + 1
+        ]
+    )
+    return JsonResponse(
+        {"bids": bids[:API_PAGE_SIZE], "has_next": len(bids) > API_PAGE_SIZE}
+    )
+
+
+@require_safe
+@condition(etag_func=auction_etag, last_modified_func=auction_last_modified)
+def auction_comments(request, auction_id):
+    """
+    Return one page of the comments of an auction, the oldest first
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request, with the optional page number
+    auction_id: int
+        Represent id of an Auction object
+
+    Return
+    ------
+    JsonResponse(): JsonResponse
+        comments: list of comments with the author username
+        has_next: true if there is a next page
+    """
+    if get_auction_row(request, auction_id) is None:
+        raise Http404("No Auction matches the given query.")
+    offset = (get_page_number(request) - 1) * API_PAGE_SIZE
+    comments = list(
+        Comment.objects.filter(auction_id=auction_id)
+        .order_by("date", "id")
+        .values("id", "title", "content", "date", author=F("user__username"))[
+            offset : offset + API_PAGE_SIZE + 1
+        ]
+    )
+    return JsonResponse(
+        {
+            "comments": comments[:API_PAGE_SIZE],
+            "has_next": len(comments) > API_PAGE_SIZE,
+        }
+    )
+
+
+def encode_since(date):
+    return str(int(date.timestamp() * 10**6))
+
+
+def decode_since(token):
+    """
+    Read a since token built by encode_since()
+
+    Return
+    ------
+    None: NoneType
+        if token is malformed
+    date: datetime
+        The date of the previous poll
+    """
+    try:
+        return datetime.fromtimestamp(int(token) / 10**6, datetime_timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        return None
+
+
+def changed_since(since, current):
+    """
+    Return the condition matching auctions changed after since
+
+    Parameters
+    ----------
+    since: datetime
+        The date of the previous poll
+    current: datetime
+        The current date
+
+    Return
+    ------
+    condition: Q
+        Any change date after since, or an end date between since and current
+    """
+    condition = Q(end_date__gt=since, end_date__lte=current)
+    for field in CHANGE_FIELDS:
+        if field != "end_date":
+            condition |= Q(**{f"{field}__gt": since})
+    return condition
+
+
+@require_safe
+def auction_states(request):
+    """
+    Return the state of many auctions at once
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request, ids holding comma separated auction
+        ids and the optional since holding the token of the previous poll
+
+    Return
+    ------
+    JsonResponse(): JsonResponse
+        auctions: price, bid count, high bidder name, status and end date of
+        each auction, only those changed after since if given
+        since: token to send with the next poll
+        error: the reason of a 400 response
+    """
+    try:
+        ids = {int(auction_id) for auction_id in request.GET["ids"].split(",")}
+    except (KeyError, ValueError):
+        return JsonResponse({"error": "ids must be comma separated ids"}, status=400)
+    if len(ids) > STATE_MAX_IDS:
+        return JsonResponse(
+            {"error": f"At most {STATE_MAX_IDS} ids per request"}, status=400
+        )
+    current = timezone.now()
+    condition = Q()
+    if request.GET.get("since"):
+        since = decode_since(request.GET["since"])
+        if since is None:
+            return JsonResponse({"error": "Invalid since token"}, status=400)
+        condition = changed_since(since, current)
+    # One query per shard holding some of the ids, a single one without shards
+    rows = []
+    for alias, shard_ids in group_by_shard(ids).items():
+        rows += (
+            Auction.objects.using(alias)
+            .filter(condition, id__in=shard_ids)
+            .order_by()
+            .values(*STATE_FIELDS, high_bidder_name=F("high_bidder__username"))
+        )
+    return JsonResponse({"auctions": rows, "since": encode_since(current - STATE_LAG)})
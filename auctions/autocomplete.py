@@ -0,0 +1,234 @@
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections
+from django.utils import timezone
+
+from .models import Auction
+from .shards import shard_querysets
+
+WORD_START = re.compile(r"\b\w")
+SUGGESTION_LIMIT = 10
+
+
+def normalize(text):
+    return " ".join(text.casefold().split())
+
+
+class PrefixIndex:
+    """
+    A class used to suggest titles of active auctions from typed prefixes
+
+    ...
+
+    The index lives in the memory of each process. It is read from the
+    database on first use, by a single thread, then kept up to date by add()
+    and remove() for the changes made by the process. A background thread
+    reads it again every AUCTIONS_SUGGEST_RELOAD_SECONDS and swaps in the new
+    content, to catch the changes made by other processes such as the
+    closures of expire_auctions, requests never waiting for a reload
+
+    Attributes
+    ----------
+    keys: list
+        Sorted list of (title from a word start, auction id) tuples
+    entries: dict
+        Auction id to its (title, end date)
+    loaded: boolean
+        True once the active auctions have been read
+    lock: Lock
+        Serialize the swap of a new content and the changes between threads
+    load_lock: Lock
+        Make the threads arriving before the first load wait for it
+    reloader: Thread
+        The thread reading the index again, None until the first load
+
+    Methods
+    -------
+    load():
+        Read the titles of all active auctions
+
+    ensure_loaded():
+        Read the index once, before its first use
+
+    reload_every(interval):
+        Read the index every interval seconds, forever
+
+    add(auction_id, title, end):
+        Add an auction to the index
+
+    remove(auction_id):
+        Remove an auction from the index
+
+    suggest(prefix, limit, current):
+        Return the auctions with a title word starting with prefix
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.entries = {}
+        self.loaded = False
+        self.lock = threading.Lock()
+        self.load_lock = threading.Lock()
+        self.reloader = None
+
+    def load(self):
+        """
+        Read the titles of all active auctions, replacing the index content
+        """
+        entries = {
+            auction_id: (title, end)
+            for queryset in shard_querysets(Auction.objects.active())
+            for auction_id, title, end in queryset.values_list(
+                "id", "title", "end_date"
+            )
+        }
+        keys = sorted(
+            (key, auction_id)
+            for auction_id, (title, _) in entries.items()
+            for key in self.title_keys(title)
+        )
+        with self.lock:
+            self.entries, self.keys, self.loaded = entries, keys, True
+
+    def ensure_loaded(self):
+        """
+        Read the index if it was never read and start the reloader
+
+        The first caller reads it, the threads arriving meanwhile wait for
+        that read instead of running their own
+        """
+        if self.loaded:
+            return
+        with self.load_lock:
+            if self.loaded:
+                return
+            self.load()
+            if self.reloader is None:
+                self.reloader = threading.Thread(
+                    target=self.reload_every,
+                    args=(settings.AUCTIONS_SUGGEST_RELOAD_SECONDS,),
+                    name="suggest-reloader",
+                    daemon=True,
+                )
+                self.reloader.start()
+
+    def reload_every(self, interval):
+        """
+        Read the index every interval seconds, run by the reloader thread
+
+        A failed read keeps the current content until the next one
+
+        Parameters
+        ----------
+        interval: float
+            Seconds between two reads
+        """
+        while True:
+            time.sleep(interval)
+            try:
+                self.load()
+            except DatabaseError:
+                pass
+            finally:
+                close_old_connections()
+
+    @staticmethod
+    def title_keys(title):
+        """
+        Return the title from the start of each of its words
+
+        "Red bike" gives "red bike" and "bike", so it is suggested for
+        "re" as well as for "bi"
+        """
+        title = normalize(title)
+        return {title[match.start() :] for match in WORD_START.finditer(title)}
+
+    def add(self, auction_id, title, end):
+        """
+        Add an auction to the index, nothing is done before it's loaded
+
+        Parameters
+        ----------
+        auction_id: int
+            Represent id of an Auction object
+        title: str
+            The title of the auction
+        end: datetime
+            The end date of the auction
+        """
+        with self.lock:
+            if not self.loaded:
+                return
+            self._remove(auction_id)
+            self.entries[auction_id] = (title, end)
+            for key in self.title_keys(title):
+                insort(self.keys, (key, auction_id))
+
+    def remove(self, auction_id):
+        """
+        Remove an auction from the index
+
+        Parameters
+        ----------
+        auction_id: int
+            Represent id of an Auction object
+        """
+        with self.lock:
+            self._remove(auction_id)
+
+    def _remove(self, auction_id):
+        entry = self.entries.pop(auction_id, None)
+        if entry is None:
+            return
+        for key in self.title_keys(entry[0]):
+            index = bisect_left(self.keys, (key, auction_id))
+            if index < len(self.keys) and self.keys[index] == (key, auction_id):
+                del self.keys[index]
+
+    def suggest(self, prefix, limit=SUGGESTION_LIMIT, current=None):
+        """
+        Return the auctions with a title word starting with prefix
+
+        Auctions whose end date is passed are skipped, so the index stays
+        right between two runs of expire_auctions
+
+        Parameters
+        ----------
+        prefix: str
+            The text typed by the user
+        limit: int
+            Maximum number of suggestions
+        current: datetime
+            The current date, timezone.now() if None
+
+        Return
+        ------
+        suggestions: list
+            (auction id, title) tuples sorted by the matched part of the title
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        self.ensure_loaded()
+        current = current or timezone.now()
+        suggestions = []
+        seen = set()
+        with self.lock:
+            index = bisect_left(self.keys, (prefix,))
+            while index < len(self.keys) and len(suggestions) < limit:
+                key, auction_id = self.keys[index]
+                if not key.startswith(prefix):
+                    break
+                index += 1
+                title, end = self.entries[auction_id]
+                if auction_id not in seen and end > current:
+                    seen.add(auction_id)
+                    suggestions.append((auction_id, title))
+        return suggestions
+
+
+title_index = PrefixIndex()
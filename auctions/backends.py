@@ -0,0 +1,23 @@
+from django.contrib.auth.backends import ModelBackend
+
+from .cache import get_cached_user
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    A class used to authenticate users like ModelBackend, with the user of
+    a session read from the cache
+
+    ...
+
+    AuthenticationMiddleware loads the user of the session on every request,
+    a cache hit saves that query on the user table
+
+    Methods
+    -------
+    get_user(user_id):
+        Return the active user user_id or None
+    """
+
+    def get_user(self, user_id):
+        return get_cached_user(user_id, super().get_user)
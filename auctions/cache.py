@@ -0,0 +1,140 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+def user_key(user_id):
+    return f"auctions:user:{user_id}"
+
+
+def get_cached_user(user_id, load):
+    """
+    Return the user user_id from the cache, calling load on a miss
+
+    Users are kept AUCTIONS_USER_CACHE_SECONDS, an edit made in another
+    process being seen after at most that delay. With 0 load is called on
+    every request
+
+    Parameters
+    ----------
+    user_id: int
+        Represent id of a User object
+    load: function
+        Read the user from the database, given user_id
+
+    Return
+    ------
+    None: NoneType
+        if load() found no user
+    user: User
+        if not
+    """
+    timeout = getattr(settings, "AUCTIONS_USER_CACHE_SECONDS", 0)
+    if not timeout:
+        return load(user_id)
+    key = user_key(user_id)
+    user = cache.get(key)
+    if user is None:
+        user = load(user_id)
+        if user is not None:
+            cache.set(key, user, timeout)
+    return user
+
+
+def forget_user(user_id):
+    """
+    Remove a user from the cache after it changed
+    """
+    cache.delete(user_key(user_id))
+
+
+def watchlist_count_key(user_id):
+    return f"auctions:watchlist-count:{user_id}"
+
+
+def get_cached_watchlist_count(user_id, count):
+    """
+    Return the size of the watchlist of user_id from the cache, calling
+    count on a miss
+
+    The counter is kept AUCTIONS_WATCHLIST_CACHE_SECONDS and updated by
+    change_watchlist_count(). With 0 count is called on every request
+
+    Parameters
+    ----------
+    user_id: int
+        Represent id of a User object
+    count: function
+        Count the watchlist in the database, given user_id
+
+    Return
+    ------
+    count: int
+        The size of the watchlist
+    """
+    timeout = getattr(settings, "AUCTIONS_WATCHLIST_CACHE_SECONDS", 0)
+    if not timeout:
+        return count(user_id)
+    key = watchlist_count_key(user_id)
+    size = cache.get(key)
+    if size is None:
+        size = count(user_id)
+        cache.set(key, size, timeout)
+    return size
+
+
+def change_watchlist_count(user_id, delta):
+    """
+    Add delta to the cached watchlist counter of user_id
+
+    Nothing is done on a miss, the next read will count it again
+
+    Parameters
+    ----------
+    user_id: int
+        Represent id of a User object
+    delta: int
+        1 when an auction is added, -1 when removed
+    """
+    if not getattr(settings, "AUCTIONS_WATCHLIST_CACHE_SECONDS", 0):
+        return
+    try:
+        cache.incr(watchlist_count_key(user_id), delta)
+    except ValueError:
+        pass
+
+
+FRAGMENT_TIMEOUT = 24 * 60 * 60
+FRAGMENT_HITS_KEY = "auctions:fragment-hits"
+FRAGMENT_MISSES_KEY = "auctions:fragment-misses"
+
+
+def record_fragment_lookups(hits, misses):
+    """
+    Add hits and misses to the fragment cache counters
+    """
+    for key, count in ((FRAGMENT_HITS_KEY, hits), (FRAGMENT_MISSES_KEY, misses)):
+        if count:
+            if not cache.add(key, count, None):
+                try:
+                    cache.incr(key, count)
+                except ValueError:
+                    cache.set(key, count, None)
+
+
+def get_fragment_stats():
+    """
+    Return the fragment cache counters
+
+    Return
+    ------
+    stats: dict
+        hits, misses and hit_ratio, None before any lookup
+    """
+    hits = cache.get(FRAGMENT_HITS_KEY, 0)
+    misses = cache.get(FRAGMENT_MISSES_KEY, 0)
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / total if total else None,
+    }
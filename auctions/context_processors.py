@@ -0,0 +1,57 @@
+from .cache import get_cached_watchlist_count
+from .models import User
+from .shards import get_shards
+
+
+def watched_by(user_id):
+    """
+    Return the rows of the watchlist table of user_id, one queryset per shard
+
+    Every shard is counted even in a request bound to one of them
+    """
+    rows = User.watchlist.through.objects.filter(user_id=user_id)
+    return [rows.using(alias) for alias in get_shards()] or [rows]
+
+
+def count_watchlist(user_id):
+    return sum(queryset.count() for queryset in watched_by(user_id))
+
+
+def get_watchlist_count(user):
+    """
+    Return the number of auctions in user's watchlist
+
+    Read from the cache counter when there is a shared cache, else counted
+    in SQL from the watchlist table alone, whose unique index starting with
+    the user id answers it
+
+    Parameters
+    ----------
+    user: User
+        Represent a User object
+
+    Return
+    ------
+    count: int
+        The size of the watchlist
+    """
+    return get_cached_watchlist_count(user.id, count_watchlist)
+
+
+def watchlist(request):
+    """
+    Add the size of the user's watchlist to every template context
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request
+
+    Return
+    ------
+    context: dict
+        len_watchlist: the size of the watchlist, 0 for anonymous users
+    """
+    if not request.user.is_authenticated:
+        return {"len_watchlist": 0}
+    return {"len_watchlist": get_watchlist_count(request.user)}
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import re
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+EVENTS_PATH = re.compile(r"^/listings/(?P<auction_id>\d+)/events$")
+HEARTBEAT = 15
+QUEUE_SIZE = 100
+REDIS_CHANNEL = "auctions:events"
+REDIS_RETRY_SECONDS = 1
+
+_broker = None
+
+
+class LocalBroker:
+    """
+    A class used to fan out auction events to the subscribers of this process
+
+    ...
+
+    Attributes
+    ----------
+    subscribers: dict
+        Auction id to the set of (event loop, queue) of its subscribers
+
+    Methods
+    -------
+    subscribe(auction_id):
+        Return a new queue receiving the events of an auction
+
+    unsubscribe(auction_id, queue):
+        Stop sending events to queue
+
+    publish(auction_id, event, data):
+        Send an event to every subscriber of an auction
+    """
+
+    def __init__(self):
+        self.subscribers = {}
+        self.lock = threading.Lock()
+
+    def subscribe(self, auction_id):
+        """
+        Register a queue for the events of an auction
+
+        Must be called from the event loop that will read the queue
+
+        Parameters
+        ----------
+        auction_id: int
+            Represent id of an Auction object
+
+        Return
+        ------
+        queue: asyncio.Queue
+            Receives (event, data) tuples
+        """
+        queue = asyncio.Queue(QUEUE_SIZE)
+        with self.lock:
+            self.subscribers.setdefault(auction_id, set()).add(
+                (asyncio.get_running_loop(), queue)
+            )
+        return queue
+
+    def unsubscribe(self, auction_id, queue):
+        """
+        Remove a queue registered by subscribe()
+
+        Parameters
+        ----------
+        auction_id: int
+            Represent id of an Auction object
+        queue: asyncio.Queue
+            The queue returned by subscribe()
+        """
+        with self.lock:
+            subscribers = self.subscribers.get(auction_id, set())
+            subscribers.difference_update(
+                {item for item in subscribers if item[1] is queue}
+            )
+            if not subscribers:
+                self.subscribers.pop(auction_id, None)
+
+    def publish(self, auction_id, event, data):
+        """
+        Send an event to every subscriber of an auction
+
+        Can be called from any thread. A subscriber too slow to empty its
+        queue misses the event instead of blocking the publisher
+
+        Parameters
+        ----------
+        auction_id: int
+            Represent id of an Auction object
+        event: str
+            bid, comment or close
+        data: dict
+            JSON serializable payload of the event
+        """
+        with self.lock:
+            subscribers = list(self.subscribers.get(auction_id, ()))
+        for loop, queue in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, (event, data))
+
+
+class RedisBroker(LocalBroker):
+    """
+    A class used to fan out auction events to the subscribers of every process
+
+    ...
+
+    Events are published on a Redis channel of the shared cache of
+    COMMERCE_CACHE_URL (pip install redis). Each process listens to it in a
+    thread started by its first subscriber and hands the events to its own
+    subscribers like LocalBroker, so the closures of expire_auctions and the
+    events of the other workers reach every stream
+
+    Attributes
+    ----------
+    client: Redis
+        Client of the shared cache
+    listener: Thread
+        The thread reading the channel, None before the first subscriber
+
+    Methods
+    -------
+    subscribe(auction_id):
+        Return a new queue receiving the events of an auction
+
+    publish(auction_id, event, data):
+        Send an event to every subscriber of an auction, in any process
+
+    listen():
+        Hand the events of the channel to the subscribers of this process
+    """
+
+    def __init__(self, client=None):
+        super().__init__()
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(settings.CACHES["default"]["LOCATION"])
+        self.client = client
+        self.listener = None
+
+    def subscribe(self, auction_id):
+        with self.lock:
+            if self.listener is None:
+                self.listener = threading.Thread(
+                    target=self.listen, name="event-listener", daemon=True
+                )
+                self.listener.start()
+        return super().subscribe(auction_id)
+
+    def publish(self, auction_id, event, data):
+        self.client.publish(REDIS_CHANNEL, json.dumps([auction_id, event, data]))
+
+    def listen(self):
+        """
+        Read the channel forever, run by the listener thread
+
+        A lost connection is opened again after REDIS_RETRY_SECONDS, the
+        events published meanwhile are missed
+        """
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(REDIS_CHANNEL)
+                for message in pubsub.listen():
+                    auction_id, event, data = json.loads(message["data"])
+                    super().publish(auction_id, event, data)
+            except Exception:
+                time.sleep(REDIS_RETRY_SECONDS)
+
+
+def _offer(queue, message):
+    try:
+        queue.put_nowait(message)
+    except asyncio.QueueFull:
+        pass
+
+
+def get_broker():
+    """
+    Return the broker set by AUCTIONS_EVENT_BROKER, a LocalBroker by default
+    """
+    global _broker
+    if _broker is None:
+        path = getattr(settings, "AUCTIONS_EVENT_BROKER", "auctions.events.LocalBroker")
+        _broker = import_string(path)()
+    return _broker
+
+
+def publish(auction_id, event, data, using=None):
+    """
+    Publish an event once the current transaction is committed
+
+    Parameters
+    ----------
+    auction_id: int
+        Represent id of an Auction object
+    event: str
+        bid, comment or close
+    data: dict
+        JSON serializable payload of the event
+    using: str
+        Alias of the database of the transaction, the default one if None
+    """
+    transaction.on_commit(
+        lambda: get_broker().publish(auction_id, event, data), using=using
+    )
+
+
+async def stream_events(scope, receive, send, auction_id):
+    """
+    ASGI application streaming the events of an auction as Server-Sent Events
+
+    The connection stays open until the client leaves, a comment line is
+    sent every HEARTBEAT seconds to keep proxies from closing it
+
+    Parameters
+    ----------
+    scope: dict
+        ASGI connection scope
+    receive: callable
+        ASGI receive channel
+    send: callable
+        ASGI send channel
+    auction_id: int
+        Represent id of an Auction object
+    """
+    broker = get_broker()
+    queue = broker.subscribe(auction_id)
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+            ],
+        }
+    )
+    disconnect = asyncio.ensure_future(wait_disconnect(receive))
+    message = None
+    try:
+        while not disconnect.done():
+            message = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {message, disconnect},
+                timeout=HEARTBEAT,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if message in done:
+                event, data = message.result()
+                body = f"event: {event}\ndata: {json.dumps(data)}\n\n"
+            else:
+                message.cancel()
+                body = ": heartbeat\n\n"
+            if not disconnect.done():
+                await send(
+                    {
+                        "type": "http.response.body",
+                        "body": body.encode(),
+                        "more_body": True,
+                    }
+                )
+    finally:
+        disconnect.cancel()
+        if message is not None:
+            message.cancel()
+        broker.unsubscribe(auction_id, queue)
+
+
+async def wait_disconnect(receive):
+    while (await receive())["type"] != "http.disconnect":
+        pass
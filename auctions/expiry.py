@@ -0,0 +1,104 @@
+from functools import partial
+
+from django.db import router, transaction
+from django.utils import timezone
+
+from .autocomplete import title_index
+from .events import publish
+from .models import Auction
+from .shards import shard_querysets
+
+
+def close_queryset(queryset, current=None):
+    """
+    Close the open auctions of queryset and notify their pages
+
+    Parameters
+    ----------
+    queryset: AuctionQuerySet
+        The auctions to close
+    current: datetime
+        The closing date, timezone.now() if None
+
+    Return
+    ------
+    closed: int
+        Number of auctions closed by this call
+    """
+    using = queryset._db or router.db_for_write(queryset.model)
+    with transaction.atomic(using=using):
+        closed = queryset.close(current)
+        for auction_id, winner in closed:
+            transaction.on_commit(partial(title_index.remove, auction_id), using)
+            publish(auction_id, "close", {"winner": winner}, using)
+    return len(closed)
+
+
+def close_auctions(auction_ids):
+    """
+    Close a group of auctions and set their winners
+
+    The highest bid wins, the earliest one if several bids have the same
+    price. The end dates are not checked, the seller may close an auction
+    early, ended auctions are closed by expire_auctions()
+
+    Parameters
+    ----------
+    auction_ids: list
+        Ids of Auction objects to close
+
+    Return
+    ------
+    closed: int
+        Number of auctions closed by this call
+    """
+    if not auction_ids:
+        return 0
+    return sum(
+        close_queryset(queryset)
+        for queryset in shard_querysets(Auction.objects.filter(id__in=auction_ids))
+    )
+
+
+def expire_auctions(current=None):
+    """
+    Close every active auction whose end date is passed
+
+    The ended auctions are found with auction_active_idx and closed in
+    the same set based statements as close_auctions()
+
+    Parameters
+    ----------
+    current: datetime
+        The current date, timezone.now() if None
+
+    Return
+    ------
+    closed: int
+        Number of auctions closed
+    """
+    current = current or timezone.now()
+    return sum(
+        close_queryset(queryset, current)
+        for queryset in shard_querysets(Auction.objects.filter(end_date__lte=current))
+    )
+
+
+def next_end_date():
+    """
+    Return the nearest end date of the open auctions
+
+    Read from auction_active_idx, one query per shard
+
+    Return
+    ------
+    None: NoneType
+        if no auction is open
+    end: datetime
+        if not
+    """
+    ends = [
+        queryset.order_by("end_date").values_list("end_date", flat=True).first()
+        for queryset in shard_querysets(Auction.objects.filter(status=True))
+    ]
+    return min((end for end in ends if end is not None), default=None)
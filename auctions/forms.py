@@ -130,4 +130,44 @@ class CategoryForm(forms.Form):
 
     """
     select = forms.ChoiceField(choices=Auction.CATEGORY_CHOICES)
-    select.widget.attrs.update({"class": "form-select form-select-lg mb-3"})
\ No newline at end of file
+    select.widget.attrs.update({"class": "form-select form-select-lg mb-3"})
+
+
+class SearchForm(forms.Form):
+    """
+    A class used to represent a form to search auctions by title and description
+
+    ...
+
+    Attributes
+    ----------
+    q: Field
+        A CharField for the searched words
+    category: Field
+        A ChoiceField to restrict the search to a category
+    all: Field
+        A BooleanField to include ended auctions
+    page: Field
+        An IntegerField for the number of the results page
+
+    Methods
+    -------
+
+    """
+    q = forms.CharField(max_length=100, label="Search")
+    q.widget.attrs.update(
+        {
+            "class": "form-control",
+            "placeholder": "Search auctions",
+            "list": "suggestions",
+            "autocomplete": "off",
+        }
+    )
+    category = forms.ChoiceField(
+        choices=[("", "All categories")] + Auction.CATEGORY_CHOICES, required=False
+    )
+    category.widget.attrs.update({"class": "form-select"})
+    all = forms.BooleanField(required=False, label="Include ended auctions")
+    page = forms.IntegerField(
+        min_value=1, max_value=100, required=False, widget=forms.HiddenInput
+    )
@@ -0,0 +1,174 @@
+import asyncio
+import io
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import quantiles
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.urls import reverse
+
+from auctions.models import Auction, User
+
+
+class Command(BaseCommand):
+    """
+    Compare the throughput of the WSGI and ASGI applications
+
+    --concurrency clients send the requests to both. The WSGI application
+    serves --workers of them at a time, like a threaded WSGI server, the
+    others waiting for a thread. The ASGI application is called by one task
+    of a single event loop per client, like one ASGI worker. Each request
+    can be delayed by --latency seconds of client think time to mimic slow
+    clients holding a connection. Latencies include the wait for the server
+    """
+
+    help = "Benchmark WSGI (threads) against ASGI (one event loop) throughput"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=200)
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=8,
+            help="Threads of the WSGI server",
+        )
+        parser.add_argument(
+            "--latency",
+            type=float,
+            default=0.05,
+            help="Seconds a slow client holds the connection before sending",
+        )
+        parser.add_argument("--host", default="localhost")
+
+    def handle(self, *args, **options):
+        from commerce.asgi import application as asgi_application
+        from commerce.wsgi import application as wsgi_application
+
+        auction = Auction.objects.active().order_by("id").first()
+        user = User.objects.order_by("id").first()
+        if auction is None or user is None:
+            raise CommandError("No active auction or user, run seed_auctions first")
+        client = Client(HTTP_HOST=options["host"])
+        client.force_login(user)
+        self.cookie = f"{settings.SESSION_COOKIE_NAME}={client.session.session_key}"
+        self.host = options["host"]
+        self.latency = options["latency"]
+        paths = [
+            reverse("index"),
+            reverse("listing_view", args=[auction.id]),
+            reverse("watchlist"),
+        ]
+        self.paths = [paths[i % len(paths)] for i in range(options["requests"])]
+
+        self.stdout.write(
+            f"{'server':<8}{'requests':>10}{'errors':>8}{'rps':>10}"
+            f"{'p50 ms':>10}{'p95 ms':>10}"
+        )
+        elapsed, results = self.run_wsgi(
+            wsgi_application, options["concurrency"], options["workers"]
+        )
+        self.write_row("wsgi", elapsed, results)
+        elapsed, results = asyncio.run(
+            self.run_asgi(asgi_application, options["concurrency"])
+        )
+        self.write_row("asgi", elapsed, results)
+
+    def write_row(self, name, elapsed, results):
+        latencies = [latency for latency, _ in results]
+        errors = sum(1 for _, status in results if status >= 400)
+        cuts = quantiles(latencies, n=100)
+        self.stdout.write(
+            f"{name:<8}{len(latencies):>10}{errors:>8}"
+            f"{len(latencies) / elapsed:>10.1f}"
+            f"{cuts[49] * 1000:>10.1f}{cuts[94] * 1000:>10.1f}"
+        )
+
+    def run_wsgi(self, application, concurrency, workers):
+        server_threads = threading.Semaphore(workers)
+
+        def call(path):
+            start = time.perf_counter()
+            time.sleep(self.latency)
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "PATH_INFO": path,
+                "QUERY_STRING": "",
+                "SERVER_NAME": self.host,
+                "SERVER_PORT": "80",
+                "HTTP_HOST": self.host,
+                "HTTP_COOKIE": self.cookie,
+                "wsgi.version": (1, 0),
+                "wsgi.url_scheme": "http",
+                "wsgi.input": io.BytesIO(),
+                "wsgi.errors": sys.stderr,
+                "wsgi.multithread": True,
+                "wsgi.multiprocess": False,
+                "wsgi.run_once": False,
+            }
+            statuses = []
+            with server_threads:
+                response = application(
+                    environ, lambda status, headers: statuses.append(int(status[:3]))
+                )
+                b"".join(response)
+                response.close()
+            return time.perf_counter() - start, statuses[0]
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as executor:
+            latencies = list(executor.map(call, self.paths))
+        return time.perf_counter() - start, latencies
+
+    async def run_asgi(self, application, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def call(path):
+            async with semaphore:
+                start = time.perf_counter()
+                await asyncio.sleep(self.latency)
+                done = asyncio.Event()
+                statuses = []
+                messages = [{"type": "http.request", "body": b""}]
+
+                async def receive():
+                    if messages:
+                        return messages.pop()
+                    await done.wait()
+                    return {"type": "http.disconnect"}
+
+                async def send(message):
+                    if message["type"] == "http.response.start":
+                        statuses.append(message["status"])
+                    if message["type"] == "http.response.body" and not message.get(
+                        "more_body"
+                    ):
+                        done.set()
+
+                scope = {
+                    "type": "http",
+                    "asgi": {"version": "3.0"},
+                    "http_version": "1.1",
+                    "method": "GET",
+                    "scheme": "http",
+                    "path": path,
+                    "raw_path": path.encode(),
+                    "query_string": b"",
+                    "root_path": "",
+                    "headers": [
+                        (b"host", self.host.encode()),
+                        (b"cookie", self.cookie.encode()),
+                    ],
+                    "client": ("127.0.0.1", 0),
+                    "server": (self.host, 80),
+                }
+                await application(scope, receive, send)
+                return time.perf_counter() - start, statuses[0]
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(call(path) for path in self.paths))
+        return time.perf_counter() - start, latencies
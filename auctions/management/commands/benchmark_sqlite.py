@@ -0,0 +1,154 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from random import Random
+from statistics import quantiles
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from auctions.signals import pragma_statements
+
+READ_SQL = (
+    "SELECT id, title, price, bid_count, end_date FROM auctions_auction "
+    "WHERE status AND end_date > ? ORDER BY end_date, id LIMIT 20"
+)
+WRITE_SQL = [
+    "UPDATE auctions_auction SET price = price + 1, bid_count = bid_count + 1, "
+    "last_bid_at = ? WHERE id = ?",
+    "INSERT INTO auctions_bid (auction_id, user_id, price, auction_date) "
+    "SELECT id, user_id, price, ? FROM auctions_auction WHERE id = ?",
+]
+
+# What a connection gets without SQLITE_PRAGMAS, python's sqlite3 waiting
+# 5 seconds for a lock
+DEFAULT_PRAGMAS = {
+    "journal_mode": "delete",
+    "synchronous": "full",
+    "busy_timeout": 5000,
+}
+
+
+class Command(BaseCommand):
+    """
+    Measure reader and writer concurrency of SQLite with and without the
+    SQLITE_PRAGMAS of the settings
+
+    The database is copied with the backup API, the copy is then hammered
+    by --readers threads running the index query and --writers threads
+    placing bids, first with the default rollback journal then with the
+    settings pragmas. Errors are "database is locked" failures
+    """
+
+    help = "Compare SQLite reader/writer contention before and after SQLITE_PRAGMAS"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--readers", type=int, default=8)
+        parser.add_argument("--writers", type=int, default=2)
+        parser.add_argument("--duration", type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("The default database is not SQLite")
+        connection.ensure_connection()
+        self.auctions = [
+            row[0]
+            for row in connection.connection.execute(
+                "SELECT id FROM auctions_auction WHERE status LIMIT 1000"
+            )
+        ]
+        if not self.auctions:
+            raise CommandError("No active auction, run seed_auctions first")
+
+        self.lock = threading.Lock()
+        profiles = [("default", DEFAULT_PRAGMAS), ("settings", settings.SQLITE_PRAGMAS)]
+        self.stdout.write(
+            f"{'profile':<10}{'kind':<8}{'ops':>8}{'errors':>8}{'ops/s':>10}"
+            f"{'p50 ms':>9}{'p95 ms':>9}"
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name, pragmas in profiles:
+                path = os.path.join(directory, f"{name}.sqlite3")
+                with sqlite3.connect(path) as target:
+                    connection.connection.backup(target)
+                target.close()
+                results, elapsed = self.run(path, pragmas, options)
+                for kind in ("read", "write"):
+                    self.write_row(name, kind, results[kind], elapsed)
+
+    def connect(self, path, pragmas):
+        db = sqlite3.connect(
+            path, timeout=pragmas["busy_timeout"] / 1000, isolation_level=None
+        )
+        for statement in pragma_statements(pragmas):
+            db.execute(statement)
+        return db
+
+    def run(self, path, pragmas, options):
+        """
+        Run the readers and writers on the database at path
+
+        Return
+        ------
+        tuple: dict, float
+            dict: "read" and "write" to (latencies, errors)
+            float: elapsed seconds
+        """
+        self.connect(path, pragmas).close()
+        deadline = time.monotonic() + options["duration"]
+        results = {"read": ([], [0]), "write": ([], [0])}
+        workers = [
+            threading.Thread(
+                target=self.work,
+                args=(path, pragmas, kind, deadline, results[kind], Random(i)),
+            )
+            for i, kind in enumerate(
+                ["read"] * options["readers"] + ["write"] * options["writers"]
+            )
+        ]
+        start = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return results, time.monotonic() - start
+
+    def work(self, path, pragmas, kind, deadline, result, random):
+        db = self.connect(path, pragmas)
+        latencies, errors = [], 0
+        while time.monotonic() < deadline:
+            current = str(timezone.now().replace(tzinfo=None))
+            start = time.perf_counter()
+            try:
+                if kind == "read":
+                    db.execute(READ_SQL, [current]).fetchall()
+                else:
+                    auction_id = random.choice(self.auctions)
+                    # A deferred transaction, like django's atomic()
+                    db.execute("BEGIN")
+                    for statement in WRITE_SQL:
+                        db.execute(statement, [current, auction_id])
+                    db.execute("COMMIT")
+            except sqlite3.OperationalError:
+                if db.in_transaction:
+                    db.execute("ROLLBACK")
+                errors += 1
+            else:
+                latencies.append(time.perf_counter() - start)
+        db.close()
+        with self.lock:
+            result[0].extend(latencies)
+            result[1][0] += errors
+
+    def write_row(self, name, kind, result, elapsed):
+        latencies, (errors,) = result
+        cuts = quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+        self.stdout.write(
+            f"{name:<10}{kind:<8}{len(latencies):>8}{errors:>8}"
+            f"{len(latencies) / elapsed:>10.1f}"
+            f"{cuts[49] * 1000:>9.2f}{cuts[94] * 1000:>9.2f}"
+        )
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from auctions.expiry import expire_auctions, next_end_date
+
+
+class Command(BaseCommand):
+    """
+    Close ended auctions and set their winners
+
+    Without --once the command keeps running: it sleeps until the nearest
+    end date read from the database, at most --refresh seconds to catch new
+    or changed auctions, then closes the auctions ended by then
+    """
+
+    help = "Close ended auctions and set their winners"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Close the ended auctions and exit",
+        )
+        parser.add_argument(
+            "--refresh",
+            type=float,
+            default=30.0,
+            help="Maximum seconds between two scans for ended auctions",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            closed = expire_auctions()
+            if closed or options["once"]:
+                self.stdout.write(f"{closed} auction(s) closed")
+            if options["once"]:
+                return
+
+            sleep = options["refresh"]
+            deadline = next_end_date()
+            if deadline is not None:
+                sleep = min(sleep, (deadline - timezone.now()).total_seconds())
+            time.sleep(max(sleep, 0))
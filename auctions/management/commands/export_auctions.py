@@ -0,0 +1,83 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db.models import F
+
+from auctions.models import Auction
+from auctions.shards import shard_querysets
+from auctions.transfer import (
+    EXPORT_FIELDS,
+    FORMATS,
+    RowWriter,
+    guess_format,
+    open_stream,
+)
+
+USERNAMES = {"seller": F("user__username"), "winner_name": F("winner__username")}
+
+
+class Command(BaseCommand):
+    """
+    Write auctions to an NDJSON or CSV file, the output of import_auctions
+
+    Auctions are read by ranges of --chunk-size ids, each range being one
+    short query read with iterator(), so memory use stays constant and no
+    read transaction stays open during the whole dump. With AUCTIONS_SHARDS
+    the shards are read one after the other, in the order of their id ranges
+    """
+
+    help = "Export auctions to NDJSON or CSV, use - for stdout"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", nargs="?", default="-", help="File to write")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Format of the file, guessed from its extension by default",
+        )
+        parser.add_argument(
+            "--active", action="store_true", help="Only the active auctions"
+        )
+        parser.add_argument(
+            "--category",
+            choices=[choice[0] for choice in Auction.CATEGORY_CHOICES],
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        queryset = Auction.objects.all()
+        if options["active"]:
+            queryset = queryset.active()
+        if options["category"]:
+            queryset = queryset.filter(category=options["category"])
+        queryset = queryset.order_by("id").values(
+            *(field for field in EXPORT_FIELDS if field not in USERNAMES),
+            **USERNAMES,
+        )
+        chunk_size = options["chunk_size"]
+
+        start = time.perf_counter()
+        count = 0
+        with open_stream(options["path"], "w") as stream:
+            writer = RowWriter(
+                stream, guess_format(options["path"], options["format"]), EXPORT_FIELDS
+            )
+            for shard_queryset in shard_querysets(queryset):
+                last_id = 0
+                while True:
+                    chunk = shard_queryset.filter(id__gt=last_id)[:chunk_size]
+                    written = 0
+                    for row in chunk.iterator(chunk_size=chunk_size):
+                        writer.write(row)
+                        last_id = row["id"]
+                        written += 1
+                    count += written
+                    if written < chunk_size:
+                        break
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed else 0
+        # The report goes to stderr when the auctions are written to stdout
+        report = self.stderr if options["path"] == "-" else self.stdout
+        report.write(
+            f"{count} auction(s) exported in {elapsed:.1f}s ({rate:.0f} rows/s)"
+        )
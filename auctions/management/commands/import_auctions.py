@@ -0,0 +1,143 @@
+import time
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from auctions.models import Auction, User
+from auctions.shards import shard_for_category
+from auctions.transfer import (
+    FORMATS,
+    IMPORT_FIELDS,
+    guess_format,
+    open_stream,
+    read_rows,
+)
+
+
+class Command(BaseCommand):
+    """
+    Create auctions from an NDJSON or CSV file
+
+    Each row holds the IMPORT_FIELDS and the seller username. Rows are read
+    one at a time, checked with the model fields (choices, lengths, url,
+    price) and written by batches of --batch-size with bulk_create, each
+    batch in its own transaction, so memory use does not grow with the
+    file. Invalid rows are reported on stderr and skipped
+
+    With AUCTIONS_SHARDS each auction goes to the shard of its category,
+    one transaction per shard and batch, and takes an id in the range of
+    that shard from its sequence set by init_shards
+    """
+
+    help = "Import auctions from NDJSON or CSV, use - for stdin"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="File to read, - for stdin")
+        parser.add_argument(
+            "--format",
+            choices=FORMATS,
+            help="Format of the file, guessed from its extension by default",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        self.sellers = {}
+        self.imported = 0
+        self.rejected = 0
+        batch_size = options["batch_size"]
+        fmt = guess_format(options["path"], options["format"])
+
+        start = time.perf_counter()
+        with open_stream(options["path"], "r") as stream:
+            batch = []
+            for number, row in read_rows(stream, fmt):
+                batch.append((number, row))
+                if len(batch) >= batch_size:
+                    self.import_batch(batch)
+                    batch = []
+            self.import_batch(batch)
+        elapsed = time.perf_counter() - start
+        rate = self.imported / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{self.imported} auction(s) imported, {self.rejected} rejected "
+            f"in {elapsed:.1f}s ({rate:.0f} rows/s)"
+        )
+
+    def import_batch(self, batch):
+        """
+        Validate a batch of rows and insert the valid ones
+
+        Parameters
+        ----------
+        batch: list
+            (line number, row) tuples, row being None if malformed
+        """
+        self.load_sellers(row.get("seller") for _, row in batch if row)
+        auctions = []
+        for number, row in batch:
+            try:
+                auctions.append(self.build(row))
+            except ValidationError as error:
+                self.rejected += 1
+                self.stderr.write(f"line {number}: {' '.join(error.messages)}")
+        shards = {}
+        for auction in auctions:
+            shards.setdefault(shard_for_category(auction.category), []).append(auction)
+        for alias, shard_auctions in shards.items():
+            with transaction.atomic(using=alias):
+                Auction.objects.using(alias).bulk_create(shard_auctions)
+        self.imported += len(auctions)
+
+    def load_sellers(self, usernames):
+        """
+        Read the ids of the sellers not already known with a single query
+        """
+        missing = {name for name in usernames if isinstance(name, str)}
+        missing -= self.sellers.keys()
+        self.sellers.update(
+            User.objects.filter(username__in=missing).values_list("username", "id")
+        )
+
+    def build(self, row):
+        """
+        Return the Auction of a row, not saved
+
+        Parameters
+        ----------
+        row: dict
+            IMPORT_FIELDS and seller, None if the line was malformed
+
+        Return
+        ------
+        auction: Auction
+            Its fields converted and validated, end_date computed
+        """
+        if row is None:
+            raise ValidationError("Malformed row")
+        seller = row.get("seller")
+        if not isinstance(seller, str) or seller not in self.sellers:
+            raise ValidationError(f"Unknown seller {seller!r}")
+        auction = Auction(
+            user_id=self.sellers[seller],
+            **{
+                field: row[field]
+                for field in IMPORT_FIELDS
+                if row.get(field) not in (None, "")
+            },
+        )
+        try:
+            auction.clean_fields(exclude=["user", "end_date"])
+        except ValidationError as error:
+            raise ValidationError(
+                [
+                    f"{field}: {message}"
+                    for field, messages in error.message_dict.items()
+                    for message in messages
+                ]
+            )
+        if timezone.is_naive(auction.creation_date):
+            auction.creation_date = timezone.make_aware(auction.creation_date)
+        auction.end_date = auction.get_end_date()
+        return auction
@@ -0,0 +1,39 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from auctions.models import User
+from auctions.shards import get_shards
+
+USER_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    """
+    Create or update the category shards of AUCTIONS_SHARDS
+
+    Each shard is migrated, its id sequences being moved to its own range
+    by the start_shard_sequences signal, and the users of the default
+    database missing from it are copied. Later changes of users are copied
+    by the copy_user_to_shards signal
+    """
+
+    help = "Migrate the category shards and copy the users to them"
+
+    def handle(self, *args, **options):
+        shards = get_shards()
+        if not shards:
+            raise CommandError("No shard, set COMMERCE_SHARD_DIR")
+        for alias in shards:
+            call_command("migrate", database=alias, verbosity=0)
+            copied = 0
+            users = User.objects.using(DEFAULT_DB_ALIAS).order_by("id")
+            last_id = 0
+            while True:
+                batch = list(users.filter(id__gt=last_id)[:USER_BATCH_SIZE])
+                if not batch:
+                    break
+                User.objects.using(alias).bulk_create(batch, ignore_conflicts=True)
+                copied += len(batch)
+                last_id = batch[-1].id
+            self.stdout.write(f"{alias}: migrated, {copied} user(s) copied")
@@ -0,0 +1,170 @@
+import json
+import threading
+import time
+from decimal import Decimal
+from random import Random
+from statistics import quantiles
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from auctions.models import Auction, User
+
+
+class Command(BaseCommand):
+    """
+    Drive simulated browsers and bidders against the application
+
+    Every thread owns a logged in test client, which goes through the
+    whole middleware stack and URL resolution like a WSGI request. Most
+    threads browse (index, listings, categories, watchlist), the others
+    place bids on hot auctions. Throughput and latency are reported per
+    URL name of auctions/urls.py
+    """
+
+    help = "Run concurrent simulated browsers and bidders, report latency per URL"
+
+    BROWSE = [
+        ("index", 40),
+        ("listing_view", 40),
+        ("category_view", 15),
+        ("watchlist", 5),
+    ]
+
+    def add_arguments(self, parser):
+        parser.add_argument("--threads", type=int, default=8)
+        parser.add_argument("--duration", type=float, default=10.0)
+        parser.add_argument(
+            "--bidders",
+            type=float,
+            default=0.25,
+            help="Fraction of the threads placing bids",
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=3.0,
+            help="Power law exponent used to pick hot auctions",
+        )
+        parser.add_argument("--host", default="localhost")
+        parser.add_argument("--json", help="Write the report to this file")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        self.auctions = list(
+            Auction.objects.active().order_by("id").values_list("id", flat=True)[:10000]
+        )
+        self.users = list(User.objects.order_by("id")[:1000])
+        if not self.auctions or not self.users:
+            raise CommandError("No active auction or user, run seed_auctions first")
+        self.categories = [choice[0] for choice in Auction.CATEGORY_CHOICES]
+        self.skew = options["skew"]
+        self.host = options["host"]
+
+        threads = options["threads"]
+        bidders = round(threads * options["bidders"])
+        deadline = time.monotonic() + options["duration"]
+        seed = Random(options["seed"])
+        self.results = {}
+        self.lock = threading.Lock()
+
+        workers = [
+            threading.Thread(
+                target=self.run_client,
+                args=(i < bidders, deadline, Random(seed.random())),
+            )
+            for i in range(threads)
+        ]
+        start = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        report = self.build_report(time.monotonic() - start)
+
+        self.write_report(report)
+        if options["json"]:
+            with open(options["json"], "w") as report_file:
+                json.dump(report, report_file, indent=2, sort_keys=True)
+
+    def pick(self, random, ids):
+        return ids[int(len(ids) * random.random() ** self.skew)]
+
+    def run_client(self, bidder, deadline, random):
+        """
+        Send requests until deadline and record their latency
+        """
+        client = Client(raise_request_exception=False, HTTP_HOST=self.host)
+        client.force_login(random.choice(self.users))
+        latencies = {}
+        errors = {}
+        try:
+            while time.monotonic() < deadline:
+                name, method, url, data = self.next_request(bidder, random)
+                start = time.perf_counter()
+                response = getattr(client, method)(url, data)
+                latencies.setdefault(name, []).append(time.perf_counter() - start)
+                if response.status_code >= 400:
+                    errors[name] = errors.get(name, 0) + 1
+        finally:
+            connections.close_all()
+        with self.lock:
+            for name, durations in latencies.items():
+                result = self.results.setdefault(name, {"latencies": [], "errors": 0})
+                result["latencies"].extend(durations)
+                result["errors"] += errors.get(name, 0)
+
+    def next_request(self, bidder, random):
+        """
+        Return the name, method, url and data of the next request
+        """
+        if bidder:
+            auction_id = self.pick(random, self.auctions)
+            price = Decimal(int(time.monotonic() * 1000) % 10**9)
+            url = reverse("listing_view", args=[auction_id])
+            return "listing_view (bid)", "post", url, {"bid": "1", "price": price}
+
+        name = random.choices(
+            [name for name, _ in self.BROWSE], [weight for _, weight in self.BROWSE]
+        )[0]
+        if name == "listing_view":
+            url = reverse(name, args=[self.pick(random, self.auctions)])
+            return name, "get", url, None
+        if name == "category_view":
+            return (
+                name,
+                "get",
+                reverse(name),
+                {"select": random.choice(self.categories)},
+            )
+        return name, "get", reverse(name), None
+
+    def build_report(self, elapsed):
+        report = {}
+        for name, result in sorted(self.results.items()):
+            durations = result["latencies"]
+            cuts = quantiles(durations, n=100) if len(durations) > 1 else durations * 99
+            report[name] = {
+                "requests": len(durations),
+                "errors": result["errors"],
+                "rps": round(len(durations) / elapsed, 1),
+                "p50_ms": round(cuts[49] * 1000, 2),
+                "p95_ms": round(cuts[94] * 1000, 2),
+                "p99_ms": round(cuts[98] * 1000, 2),
+            }
+        return report
+
+    def write_report(self, report):
+        self.stdout.write(
+            f"{'url':<22}{'requests':>10}{'errors':>8}{'rps':>9}"
+            f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+        )
+        for name, row in report.items():
+            self.stdout.write(
+                f"{name:<22}{row['requests']:>10}{row['errors']:>8}{row['rps']:>9}"
+                f"{row['p50_ms']:>9}{row['p95_ms']:>9}{row['p99_ms']:>9}"
+            )
+        total = sum(row["rps"] for row in report.values())
+        self.stdout.write(f"total throughput: {total:.1f} requests/s")
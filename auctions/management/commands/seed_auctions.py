@@ -0,0 +1,220 @@
+import time
+from array import array
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from random import Random
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from auctions.models import Auction, Bid, Comment, User
+from auctions.shards import get_shards
+
+# Largest raise of a seeded bid, so the thousands of bids of the hottest
+# auctions keep their price within the 12 digits of the price column
+BID_STEP_CENTS = 100 * 100
+
+
+@contextmanager
+def explicit_dates(model, name):
+    """
+    Let bulk_create write the dates given to the auto_now_add field name
+    """
+    field = model._meta.get_field(name)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    """
+    Fill the database with synthetic users, auctions, bids, comments and
+    watchlists for capacity planning
+
+    Rows are generated and written by batches with bulk_create, so memory
+    use does not grow with the volume. Auctions and bidders are picked with
+    a power law: with --skew 3 about half of the bids go to the first 13%
+    of the auctions
+
+    The bids of an auction raise its price above its starting price, each
+    one dated after the previous one, between the creation of the auction
+    and its end or now if it is still running
+    """
+
+    help = "Generate synthetic auctions data with bulk_create"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--auctions", type=int, default=10000)
+        parser.add_argument("--bids", type=int, default=100000)
+        parser.add_argument("--comments", type=int, default=20000)
+        parser.add_argument(
+            "--watchlist",
+            type=int,
+            default=10,
+            help="Average number of watched auctions per user",
+        )
+        parser.add_argument(
+            "--skew",
+            type=float,
+            default=3.0,
+            help="Power law exponent, 1 for uniform, higher for hotter auctions",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--password", default="password")
+        parser.add_argument("--seed", type=int, default=None)
+
+    def handle(self, *args, **options):
+        if get_shards():
+            raise CommandError(
+                "seed_auctions fills the default database only, "
+                "unset COMMERCE_SHARD_DIR or use import_auctions"
+            )
+        self.random = Random(options["seed"])
+        self.skew = options["skew"]
+        self.batch_size = options["batch_size"]
+
+        users = self.seed_users(options["users"], options["password"])
+        auctions = self.seed_auctions(options["auctions"], users)
+        with explicit_dates(Bid, "auction_date"):
+            self.seed_rows(
+                "bids",
+                options["bids"],
+                lambda i: self.build_bid(auctions, users),
+                Bid,
+            )
+        self.seed_rows(
+            "comments",
+            options["comments"],
+            lambda i: Comment(
+                auction_id=self.pick(auctions),
+                user_id=self.pick(users),
+                title=f"Comment {i}",
+                content="Synthetic comment",
+            ),
+            Comment,
+        )
+        self.seed_rows(
+            "watchlist entries",
+            options["watchlist"] * len(users),
+            lambda i: User.watchlist.through(
+                user_id=self.pick(users), auction_id=self.pick(auctions)
+            ),
+            User.watchlist.through,
+            ignore_conflicts=True,
+        )
+        start = time.perf_counter()
+        Auction.objects.filter(id__gte=auctions[0]).refresh_bid_summary()
+        self.stdout.write(
+            f"bid summary refreshed in {time.perf_counter() - start:.1f}s"
+        )
+
+    def pick_position(self, count):
+        """
+        Return a position below count, the first ones being the most likely
+        """
+        return int(count * self.random.random() ** self.skew)
+
+    def pick(self, ids):
+        """
+        Return an element of ids, the first ones being the most likely
+        """
+        return ids[self.pick_position(len(ids))]
+
+    def build_bid(self, auctions, users):
+        """
+        Return a bid above the current price of an auction, dated after its
+        previous bid and before its end
+        """
+        position = self.pick_position(len(auctions))
+        price = self.prices[position]
+        # Up to 10% of the price, at most BID_STEP_CENTS
+        price += self.random.randint(1, max(1, min(price // 10, BID_STEP_CENTS)))
+        self.prices[position] = price
+        start, end = self.bid_times[position], self.end_times[position]
+        self.bid_times[position] = start + (end - start) * self.random.random() / 4
+        return Bid(
+            auction_id=auctions[position],
+            user_id=self.pick(users),
+            price=Decimal(price).scaleb(-2),
+            auction_date=datetime.fromtimestamp(
+                self.bid_times[position], dt_timezone.utc
+            ),
+        )
+
+    def seed_users(self, count, password):
+        password = make_password(password)
+        prefix = f"seed{int(time.time())}"
+        self.seed_rows(
+            "users",
+            count,
+            lambda i: User(username=f"{prefix}_{i}", password=password),
+            User,
+        )
+        return list(
+            User.objects.filter(username__startswith=f"{prefix}_")
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    def seed_auctions(self, count, users):
+        current = timezone.now()
+        categories = [choice[0] for choice in Auction.CATEGORY_CHOICES]
+        durations = [choice[0] for choice in Auction.DURATION_CHOICES]
+        last = Auction.objects.order_by("-id").first()
+        first_id = last.id if last else 0
+        # Current price in cents, date of the last bid and latest date of a
+        # bid of each auction, in the order of their ids
+        self.prices = array("q")
+        self.bid_times = array("d")
+        self.end_times = array("d")
+
+        def build(i):
+            duration = self.random.choice(durations)
+            creation_date = current - timedelta(
+                seconds=self.random.randint(0, Auction.FOURTEEN * 24 * 3600)
+            )
+            end_date = Auction.compute_end_date(creation_date, duration)
+            price = self.random.randint(1, 100)
+            self.prices.append(price * 100)
+            self.bid_times.append(creation_date.timestamp())
+            self.end_times.append(min(end_date, current).timestamp())
+            return Auction(
+                title=f"Synthetic auction {i}",
+                description="Synthetic description",
+                creation_date=creation_date,
+                end_date=end_date,
+                duration=duration,
+                category=self.random.choice(categories),
+                user_id=self.random.choice(users),
+                price=Decimal(price),
+            )
+
+        self.seed_rows("auctions", count, build, Auction)
+        return list(
+            Auction.objects.filter(id__gt=first_id)
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+    def seed_rows(self, label, count, build, model, ignore_conflicts=False):
+        """
+        Insert count rows built by build(i) with batched bulk_create
+        """
+        start = time.perf_counter()
+        for offset in range(0, count, self.batch_size):
+            batch = [
+                build(i) for i in range(offset, min(offset + self.batch_size, count))
+            ]
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    batch, self.batch_size, ignore_conflicts=ignore_conflicts
+                )
+        elapsed = time.perf_counter() - start
+        rate = count / elapsed if elapsed else 0
+        self.stdout.write(f"{count} {label} in {elapsed:.1f}s ({rate:.0f} rows/s)")
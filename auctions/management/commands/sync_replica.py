@@ -0,0 +1,56 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    """
+    Copy the primary SQLite database to the files of the read replicas
+
+    Each copy is made with the SQLite backup API from a consistent snapshot
+    of the primary. Without --once the copies are refreshed every
+    --interval seconds, which bounds the replication lag
+    """
+
+    help = "Refresh the SQLite read replicas from the primary database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            help="Copy the primary once and exit",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1.0,
+            help="Seconds between two copies",
+        )
+
+    def handle(self, *args, **options):
+        replicas = getattr(settings, "AUCTIONS_READ_REPLICAS", [])
+        if not replicas:
+            raise CommandError("No read replica, set COMMERCE_REPLICA_PATH")
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != "sqlite":
+            raise CommandError("The primary database is not SQLite")
+
+        while True:
+            start = time.perf_counter()
+            primary.ensure_connection()
+            for alias in replicas:
+                target = sqlite3.connect(connections[alias].settings_dict["NAME"])
+                try:
+                    primary.connection.backup(target)
+                finally:
+                    target.close()
+            if options["once"]:
+                elapsed = time.perf_counter() - start
+                self.stdout.write(
+                    f"{len(replicas)} replica(s) copied in {elapsed:.2f}s"
+                )
+                return
+            time.sleep(max(options["interval"] - (time.perf_counter() - start), 0))
@@ -0,0 +1,309 @@
+import glob
+import mmap
+import os
+import threading
+import zlib
+from bisect import bisect_left
+from contextvars import ContextVar
+from time import perf_counter
+
+from django.conf import settings
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from .cache import get_fragment_stats
+
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Histograms kept for each url name, in the order of the values observed
+HISTOGRAMS = (
+    ("auctions_request_seconds", "Wall time of the request", TIME_BUCKETS),
+    ("auctions_sql_queries", "SQL queries run by the request", QUERY_BUCKETS),
+    ("auctions_sql_seconds", "Time spent in SQL queries", TIME_BUCKETS),
+    ("auctions_template_seconds", "Time spent rendering templates", TIME_BUCKETS),
+)
+
+# Requests not resolved to a url name of auctions/urls.py
+OTHER_VIEW = "other"
+
+# A metrics file starts with MAGIC and the checksum of its layout, files
+# written by another version of the code are skipped
+MAGIC = b"AUCM"
+HEADER_SIZE = 8
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Measures of the current request, set by MetricsMiddleware
+current_metrics = ContextVar("current_metrics", default=None)
+
+
+class RequestMetrics:
+    """
+    A class used to add up the SQL and template time of one request
+
+    ...
+
+    Attributes
+    ----------
+    queries: int
+        Number of SQL queries
+    sql: float
+        Seconds spent in SQL queries
+    template: float
+        Seconds spent rendering templates
+    depth: int
+        Number of templates being rendered, a template rendered inside
+        another one is not counted twice
+    """
+
+    __slots__ = ("queries", "sql", "template", "depth")
+
+    def __init__(self):
+        self.queries = 0
+        self.sql = 0.0
+        self.template = 0.0
+        self.depth = 0
+
+
+def record_query(execute, sql, params, many, context):
+    """
+    Database execute wrapper adding each query to the current request
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.queries += 1
+        metrics.sql += perf_counter() - start
+
+
+class TimedTemplate(Template):
+    """
+    A Django template adding its render time to the current request
+    """
+
+    def render(self, context=None, request=None):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+        metrics.depth += 1
+        start = perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.depth -= 1
+            if not metrics.depth:
+                metrics.template += perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """
+    The Django template backend, its templates measuring their render time
+    """
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
+
+
+def get_view_names():
+    """
+    Return the url names of auctions/urls.py, sorted, then OTHER_VIEW
+    """
+    from .urls import urlpatterns
+
+    return sorted({pattern.name for pattern in urlpatterns if pattern.name}) + [
+        OTHER_VIEW
+    ]
+
+
+class MetricStore:
+    """
+    A class used to keep the histograms of every view in a flat array of doubles
+
+    ...
+
+    Each histogram takes one slot per bucket, counting the observations
+    of that bucket only, one for +Inf and one for the sum. With
+    AUCTIONS_METRICS_DIR the array is a file of that directory mapped in
+    memory, one per process, and the files of all processes are added up
+    when read. Otherwise it lives in the memory of the process
+
+    Attributes
+    ----------
+    views: list
+        The url names, in the order of the array
+    offsets: dict
+        View name to the first slot of each of its histograms
+    size: int
+        Number of slots
+    lock: Lock
+        Serialize the updates of the threads of the process
+    owner: tuple
+        The process id and directory the array was opened for
+    values: memoryview
+        The slots, as doubles
+
+    Methods
+    -------
+    observe(view, values):
+        Add the measures of a request to the histograms of view
+
+    totals():
+        Return the slots added up over every process
+
+    render():
+        Return the histograms in the Prometheus text format
+    """
+
+    def __init__(self, views=None):
+        self.views = views or get_view_names()
+        self.offsets = {}
+        self.size = 0
+        for view in self.views:
+            self.offsets[view] = []
+            for _, _, buckets in HISTOGRAMS:
+                self.offsets[view].append(self.size)
+                self.size += len(buckets) + 2
+        layout = repr((self.views, HISTOGRAMS)).encode()
+        self.header = MAGIC + zlib.crc32(layout).to_bytes(4, "little")
+        self.lock = threading.Lock()
+        self.owner = None
+        self.values = None
+
+    def get_directory(self):
+        return getattr(settings, "AUCTIONS_METRICS_DIR", None)
+
+    def open(self):
+        """
+        Create the array of the current process, in memory or in its file
+        """
+        directory = self.get_directory()
+        length = HEADER_SIZE + self.size * 8
+        if directory:
+            path = os.path.join(directory, f"{os.getpid()}.metrics")
+            descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                os.ftruncate(descriptor, length)
+                buffer = mmap.mmap(descriptor, length)
+            finally:
+                os.close(descriptor)
+            if buffer[:HEADER_SIZE] != self.header:
+                buffer[:] = bytes(length)
+        else:
+            buffer = bytearray(length)
+        buffer[:HEADER_SIZE] = self.header
+        self.values = memoryview(buffer)[HEADER_SIZE:].cast("d")
+        self.owner = (os.getpid(), directory)
+
+    def observe(self, view, values):
+        """
+        Add the measures of a request to the histograms of view
+
+        Parameters
+        ----------
+        view: str
+            Url name of the request, OTHER_VIEW if unknown
+        values: tuple
+            One value per histogram of HISTOGRAMS
+        """
+        offsets = self.offsets.get(view) or self.offsets[OTHER_VIEW]
+        with self.lock:
+            if self.owner != (os.getpid(), self.get_directory()):
+                self.open()
+            slots = self.values
+            for start, (_, _, buckets), value in zip(offsets, HISTOGRAMS, values):
+                slots[start + bisect_left(buckets, value)] += 1
+                slots[start + len(buckets) + 1] += value
+
+    def totals(self):
+        """
+        Return the slots added up over every process
+
+        Return
+        ------
+        totals: list
+            One float per slot
+        """
+        directory = self.get_directory()
+        if not directory:
+            if self.values is None:
+                return [0.0] * self.size
+            with self.lock:
+                return self.values.tolist()
+        totals = [0.0] * self.size
+        for path in glob.glob(os.path.join(directory, "*.metrics")):
+            with open(path, "rb") as metrics_file:
+                content = metrics_file.read()
+            if content[:HEADER_SIZE] != self.header:
+                continue
+            slots = memoryview(content)[HEADER_SIZE:].cast("d")
+            for slot, value in enumerate(slots[: self.size]):
+                totals[slot] += value
+        return totals
+
+    def render(self):
+        """
+        Return the histograms in the Prometheus text format
+
+        Views without any request are left out
+        """
+        totals = self.totals()
+        lines = []
+        for position, (name, description, buckets) in enumerate(HISTOGRAMS):
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} histogram")
+            for view in self.views:
+                start = self.offsets[view][position]
+                counts = totals[start : start + len(buckets) + 1]
+                count = sum(counts)
+                if not count:
+                    continue
+                label = f'view="{view}"'
+                cumulative = 0
+                for bound, bucket_count in zip((*buckets, "+Inf"), counts):
+                    cumulative += bucket_count
+                    lines.append(
+                        f'{name}_bucket{{{label},le="{bound}"}} {cumulative:.0f}'
+                    )
+                lines.append(f"{name}_sum{{{label}}} {totals[start + len(counts)]!r}")
+                lines.append(f"{name}_count{{{label}}} {count:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+_store = None
+
+
+def get_metric_store():
+    """
+    Return the MetricStore of the process, created on first use since the
+    url names are only known once the urls are loaded
+    """
+    global _store
+    if _store is None:
+        _store = MetricStore()
+    return _store
+
+
+def render_metrics():
+    """
+    Return the view histograms and the fragment cache counters in the
+    Prometheus text format
+    """
+    stats = get_fragment_stats()
+    lines = []
+    for kind in ("hits", "misses"):
+        name = f"auctions_fragment_cache_{kind}_total"
+        lines.append(f"# HELP {name} Listing card fragment cache {kind}")
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {stats[kind]}")
+    return get_metric_store().render() + "\n".join(lines) + "\n"
@@ -0,0 +1,180 @@
+import time
+from asyncio import iscoroutinefunction
+from time import perf_counter
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import Resolver404, resolve
+from django.utils.decorators import sync_and_async_middleware
+
+from .metrics import RequestMetrics, current_metrics, get_metric_store
+from .routers import routing
+from .shards import current_shard, get_shards, shard_for_category, shard_for_id
+
+PIN_COOKIE = "auctions_primary_until"
+
+
+def get_pin_seconds():
+    return getattr(settings, "AUCTIONS_REPLICA_PIN_SECONDS", 5)
+
+
+def start_routing(request):
+    """
+    Pin the request to the primary if it may write or if its browser wrote
+    less than AUCTIONS_REPLICA_PIN_SECONDS ago
+    """
+    try:
+        pinned_until = float(request.COOKIES.get(PIN_COOKIE, 0))
+    except ValueError:
+        pinned_until = 0
+    pinned = request.method not in ("GET", "HEAD") or pinned_until > time.time()
+    return routing.set({"pinned": pinned, "wrote": False})
+
+
+def finish_routing(token, response):
+    """
+    Set the pin cookie on the response of a request that wrote
+    """
+    state = routing.get()
+    routing.reset(token)
+    if state["wrote"]:
+        seconds = get_pin_seconds()
+        response.set_cookie(
+            PIN_COOKIE,
+            str(time.time() + seconds),
+            max_age=seconds,
+            httponly=True,
+            samesite="Lax",
+        )
+    return response
+
+
+@sync_and_async_middleware
+def ReplicaPinMiddleware(get_response):
+    """
+    Read your writes with read replicas
+
+    A browser reads from the primary database during a short window after
+    each request that wrote, the window being kept in a cookie so it works
+    whatever the server handling the next request
+    """
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            token = start_routing(request)
+            try:
+                response = await get_response(request)
+            except BaseException:
+                routing.reset(token)
+                raise
+            return finish_routing(token, response)
+
+    else:
+
+        def middleware(request):
+            token = start_routing(request)
+            try:
+                response = get_response(request)
+            except BaseException:
+                routing.reset(token)
+                raise
+            return finish_routing(token, response)
+
+    return middleware
+
+
+def request_shard(request):
+    """
+    Return the shard named by the url of request, None if it names none
+
+    The shard comes from the auction id of the url, else from the category
+    of the query string
+    """
+    try:
+        match = resolve(request.path_info, getattr(request, "urlconf", None))
+    except Resolver404:
+        return None
+    for name in ("listing_id", "auction_id"):
+        if name in match.kwargs:
+            return shard_for_id(match.kwargs[name])
+    category = request.GET.get("select") or request.GET.get("category")
+    return shard_for_category(category) if category else None
+
+
+@sync_and_async_middleware
+def ShardMiddleware(get_response):
+    """
+    Bind the requests about one auction or one category to its shard
+
+    The queries of the view on auctions, bids, comments and watchlists then
+    go to that shard through auctions.routers.ShardRouter, the other
+    requests fan out over every shard. Nothing is done without
+    AUCTIONS_SHARDS
+    """
+    if not get_shards():
+        raise MiddlewareNotUsed
+
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            token = current_shard.set(request_shard(request))
+            try:
+                return await get_response(request)
+            finally:
+                current_shard.reset(token)
+
+    else:
+
+        def middleware(request):
+            token = current_shard.set(request_shard(request))
+            try:
+                return get_response(request)
+            finally:
+                current_shard.reset(token)
+
+    return middleware
+
+
+def finish_metrics(token, request, start):
+    """
+    Add the measures of the request to the histograms of its url name
+    """
+    metrics = current_metrics.get()
+    current_metrics.reset(token)
+    match = getattr(request, "resolver_match", None)
+    get_metric_store().observe(
+        match.url_name if match else None,
+        (perf_counter() - start, metrics.queries, metrics.sql, metrics.template),
+    )
+
+
+@sync_and_async_middleware
+def MetricsMiddleware(get_response):
+    """
+    Measure the wall time, SQL queries, SQL time and template render time
+    of each request
+
+    The measures go to the histograms of auctions.metrics, served at
+    /metrics. Placed first so the wall time covers the other middlewares
+    """
+    if iscoroutinefunction(get_response):
+
+        async def middleware(request):
+            start = perf_counter()
+            token = current_metrics.set(RequestMetrics())
+            try:
+                return await get_response(request)
+            finally:
+                finish_metrics(token, request, start)
+
+    else:
+
+        def middleware(request):
+            start = perf_counter()
+            token = current_metrics.set(RequestMetrics())
+            try:
+                return get_response(request)
+            finally:
+                finish_metrics(token, request, start)
+
+    return middleware
@@ -0,0 +1,93 @@
+# Generated by Django 4.1.2 on 2026-10-18 01:45
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0003_remove_auction_end_date_auction_duration_and_more"),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name="auction",
+            old_name="start_price",
+            new_name="price",
+        ),
+        migrations.RenameField(
+            model_name="auction",
+            old_name="seller",
+            new_name="user",
+        ),
+        migrations.RemoveField(
+            model_name="comment",
+            name="comment_date",
+        ),
+        migrations.AddField(
+            model_name="auction",
+            name="bids",
+            field=models.ManyToManyField(
+                blank=True, related_name="bids", to="auctions.bid"
+            ),
+        ),
+        migrations.AddField(
+            model_name="auction",
+            name="comments",
+            field=models.ManyToManyField(
+                blank=True, related_name="comments", to="auctions.comment"
+            ),
+        ),
+        migrations.AddField(
+            model_name="auction",
+            name="remaining",
+            field=models.CharField(blank=True, max_length=32),
+        ),
+        migrations.AddField(
+            model_name="auction",
+            name="status",
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name="auction",
+            name="winner",
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="date",
+            field=models.DateField(
+                auto_now_add=True, default=django.utils.timezone.now
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="title",
+            field=models.CharField(default="New comment", max_length=64),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="watchlist",
+            field=models.ManyToManyField(
+                blank=True, related_name="listings", to="auctions.auction"
+            ),
+        ),
+        migrations.AlterField(
+            model_name="auction",
+            name="duration",
+            field=models.IntegerField(
+                choices=[(1, "1 day"), (3, "3 days"), (7, "7 days"), (14, "14 days")]
+            ),
+        ),
+        migrations.AlterField(
+            model_name="auction",
+            name="image",
+            field=models.URLField(
+                blank=True,
+                default="https://cdn.onlinewebfonts.com/svg/img_391144.png",
+                null=True,
+            ),
+        ),
+    ]
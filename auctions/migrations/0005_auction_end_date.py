@@ -0,0 +1,49 @@
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.db.models import F
+import django.utils.timezone
+
+
+def fill_end_date(apps, schema_editor):
+    """
+    Set end_date to creation_date + duration, one UPDATE per duration
+    """
+    Auction = apps.get_model("auctions", "Auction")
+    durations = Auction.objects.values_list("duration", flat=True).distinct()
+    for duration in list(durations):
+        Auction.objects.filter(duration=duration).update(
+            end_date=F("creation_date") + timedelta(days=duration)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0004_sync_models"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="auction",
+            name="end_date",
+            field=models.DateTimeField(editable=False, null=True),
+        ),
+        migrations.RunPython(fill_end_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="auction",
+            name="end_date",
+            field=models.DateTimeField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name="auction",
+            name="creation_date",
+            field=models.DateTimeField(
+                default=django.utils.timezone.now, editable=False
+            ),
+        ),
+        migrations.RemoveField(
+            model_name="auction",
+            name="remaining",
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 4.1.2 on 2026-10-18 01:46
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Max, OuterRef, Subquery
+import django.db.models.deletion
+
+
+def fill_bid_summary(apps, schema_editor):
+    """
+    Compute bid_count, high_bidder and last_bid_at from the existing bids
+    """
+    Auction = apps.get_model("auctions", "Auction")
+    Bid = apps.get_model("auctions", "Bid")
+    bids = Bid.objects.filter(auction=OuterRef("pk"))
+    Auction.objects.filter(id__in=Bid.objects.values("auction")).update(
+        bid_count=Subquery(
+            bids.order_by().values("auction").annotate(n=Count("id")).values("n")
+        ),
+        high_bidder=Subquery(
+            bids.order_by("-price", "auction_date").values("user")[:1]
+        ),
+        last_bid_at=Subquery(
+            bids.order_by()
+            .values("auction")
+            .annotate(m=Max("auction_date"))
+            .values("m")
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0005_auction_end_date"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="auction",
+            name="bid_count",
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name="auction",
+            name="high_bidder",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="leading",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="auction",
+            name="last_bid_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_bid_summary, migrations.RunPython.noop),
+    ]
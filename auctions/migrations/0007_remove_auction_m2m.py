@@ -0,0 +1,42 @@
+# Generated by Django 4.1.2 on 2026-10-18 01:47
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0006_auction_bid_summary"),
+    ]
+
+    # Bid.auction and Comment.auction already hold the same links, only the
+    # duplicate join tables are dropped
+    operations = [
+        migrations.RemoveField(
+            model_name="auction",
+            name="bids",
+        ),
+        migrations.RemoveField(
+            model_name="auction",
+            name="comments",
+        ),
+        migrations.AlterField(
+            model_name="bid",
+            name="auction",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="bids",
+                to="auctions.auction",
+            ),
+        ),
+        migrations.AlterField(
+            model_name="comment",
+            name="auction",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="comments",
+                to="auctions.auction",
+            ),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.1.2 on 2026-10-18 01:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0007_remove_auction_m2m"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="auction",
+            index=models.Index(
+                condition=models.Q(("status", True)),
+                fields=["end_date"],
+                name="auction_active_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="auction",
+            index=models.Index(
+                condition=models.Q(("status", True)),
+                fields=["category", "end_date"],
+                name="auction_category_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="bid",
+            index=models.Index(
+                fields=["auction", "-price", "auction_date"],
+                name="bid_auction_price_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["auction", "date"], name="comment_auction_date_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,70 @@
+from django.db import migrations
+
+CREATE_SQL = [
+    """
+    CREATE VIRTUAL TABLE auctions_auction_fts USING fts5(
+        title, description,
+        content='auctions_auction', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER auctions_auction_fts_insert AFTER INSERT ON auctions_auction
+    BEGIN
+        INSERT INTO auctions_auction_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    """
+    CREATE TRIGGER auctions_auction_fts_delete AFTER DELETE ON auctions_auction
+    BEGIN
+        INSERT INTO auctions_auction_fts(auctions_auction_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+    END
+    """,
+    """
+    CREATE TRIGGER auctions_auction_fts_update
+    AFTER UPDATE OF title, description ON auctions_auction
+    BEGIN
+        INSERT INTO auctions_auction_fts(auctions_auction_fts, rowid, title, description)
+        VALUES ('delete', old.id, old.title, old.description);
+        INSERT INTO auctions_auction_fts(rowid, title, description)
+        VALUES (new.id, new.title, new.description);
+    END
+    """,
+    "INSERT INTO auctions_auction_fts(auctions_auction_fts) VALUES ('rebuild')",
+]
+
+DROP_SQL = [
+    "DROP TRIGGER IF EXISTS auctions_auction_fts_update",
+    "DROP TRIGGER IF EXISTS auctions_auction_fts_delete",
+    "DROP TRIGGER IF EXISTS auctions_auction_fts_insert",
+    "DROP TABLE IF EXISTS auctions_auction_fts",
+]
+
+
+def run_sql(statements):
+    """
+    Build a RunPython function executing statements on SQLite only
+    """
+
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0008_query_indexes"),
+    ]
+
+    # Full-text index of Auction.title and description, kept in sync by
+    # triggers. Updates of the other columns (price, status...) do not touch it
+    operations = [
+        migrations.RunPython(run_sql(CREATE_SQL), run_sql(DROP_SQL)),
+    ]
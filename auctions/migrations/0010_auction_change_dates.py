@@ -0,0 +1,52 @@
+# Generated by Django 4.1.2 on 2026-10-18 02:00
+
+from datetime import datetime, time, timezone
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def fill_change_dates(apps, schema_editor):
+    """
+    Fill last_comment_at and closed_at for the existing auctions
+
+    Comments only store a day, the last comment is dated at its midnight.
+    Auctions closed before their end date are dated now
+    """
+    Auction = apps.get_model("auctions", "Auction")
+    Comment = apps.get_model("auctions", "Comment")
+    days = (
+        Comment.objects.order_by()
+        .values("auction")
+        .annotate(last=Max("date"))
+        .values_list("auction", "last")
+    )
+    for auction_id, day in days.iterator():
+        Auction.objects.filter(id=auction_id).update(
+            last_comment_at=datetime.combine(day, time(), timezone.utc)
+        )
+    current = datetime.now(timezone.utc)
+    closed = Auction.objects.filter(status=False)
+    closed.filter(end_date__lte=current).update(closed_at=models.F("end_date"))
+    closed.filter(end_date__gt=current).update(closed_at=current)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0009_auction_fts"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="auction",
+            name="closed_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name="auction",
+            name="last_comment_at",
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(fill_change_dates, migrations.RunPython.noop),
+    ]
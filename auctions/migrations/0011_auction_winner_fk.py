@@ -0,0 +1,76 @@
+# Generated by Django 4.1.2 on 2026-10-18 02:20
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+
+def fill_winners(apps, schema_editor):
+    """
+    Set winner and winning_bid of the closed auctions from their best bid
+    """
+    Auction = apps.get_model("auctions", "Auction")
+    Bid = apps.get_model("auctions", "Bid")
+    best = Bid.objects.filter(auction=OuterRef("pk")).order_by("-price", "auction_date")
+    Auction.objects.filter(status=False, id__in=Bid.objects.values("auction")).update(
+        winner=Subquery(best.values("user")[:1]),
+        winning_bid=Subquery(best.values("id")[:1]),
+    )
+
+
+def fill_winner_names(apps, schema_editor):
+    """
+    Set winner_name back from the winner username
+    """
+    Auction = apps.get_model("auctions", "Auction")
+    User = apps.get_model("auctions", "User")
+    Auction.objects.filter(winner__isnull=False).update(
+        winner_name=Subquery(
+            User.objects.filter(id=OuterRef("winner")).values("username")[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("auctions", "0010_auction_change_dates"),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name="auction",
+            old_name="winner",
+            new_name="winner_name",
+        ),
+        migrations.AddField(
+            model_name="auction",
+            name="winner",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="won",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="auction",
+            name="winning_bid",
+            field=models.ForeignKey(
+                blank=True,
+                editable=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="auctions.bid",
+            ),
+        ),
+        migrations.RunPython(fill_winners, fill_winner_names),
+        migrations.RemoveField(
+            model_name="auction",
+            name="winner_name",
+        ),
+    ]
@@ -2,6 +2,8 @@ from datetime import timedelta
 
 from django.contrib.auth.models import AbstractUser
 from django.db import models
+from django.db.models import Count, Max, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 
 
@@ -15,6 +17,8 @@ class User(AbstractUser):
     ----------
     watchlist: Field
         ManyToManyField to store all the auctions that the user saved 
+    won: RelatedManager
+        Auctions won by the user, reverse of Auction.winner
 
     Methods
     -------
@@ -23,6 +27,119 @@ class User(AbstractUser):
     watchlist = models.ManyToManyField("Auction", blank=True, related_name="listings")
 
 
+class AuctionQuerySet(models.QuerySet):
+    """
+    A class used to represent a set of auctions
+
+    ...
+
+    Methods
+    -------
+    create(**kwargs):
+        Create an auction on the database chosen for the instance
+
+    active(current):
+        Return auctions still open at current
+
+    refresh_bid_summary():
+        Recompute price, bid_count, high_bidder and last_bid_at from bids
+
+    close(current):
+        Close the open auctions and set their winners
+    """
+
+    def create(self, **kwargs):
+        """
+        Create an auction, the routers seeing the instance and so its category
+
+        QuerySet.create() asks the routers for a database without the
+        instance, which would put every auction on the default database
+        with AUCTIONS_SHARDS
+        """
+        auction = self.model(**kwargs)
+        auction.save(force_insert=True, using=self._db)
+        return auction
+
+    def active(self, current=None):
+        """
+        Filter the auctions open and not ended
+
+        Parameters
+        ----------
+        current: datetime
+            The current date, timezone.now() if None
+
+        Return
+        ------
+        queryset: AuctionQuerySet
+            The active auctions
+        """
+        return self.filter(status=True, end_date__gt=current or timezone.now())
+
+    def refresh_bid_summary(self):
+        """
+        Recompute the denormalized bid columns of the auctions with bids
+
+        Used after bids are written in bulk without place_bid()
+
+        Return
+        ------
+        updated: int
+            Number of auctions updated
+        """
+        bids = Bid.objects.filter(auction=OuterRef("pk")).order_by()
+        highest = bids.order_by("-price", "auction_date")[:1]
+        return self.filter(id__in=Bid.objects.values("auction")).update(
+            price=Subquery(highest.values("price")),
+            high_bidder=Subquery(highest.values("user")),
+            bid_count=Subquery(
+                bids.values("auction").annotate(n=Count("id")).values("n")
+            ),
+            last_bid_at=Subquery(
+                bids.values("auction").annotate(m=Max("auction_date")).values("m")
+            ),
+        )
+
+    def close(self, current=None):
+        """
+        Close the open auctions of the queryset and set their winners
+
+        The highest bid wins, the earliest one if several bids have the same
+        price. Winners are read and written with one statement each, whatever
+        the number of auctions, the bids being searched with
+        bid_auction_price_idx. Call it inside a transaction
+
+        Parameters
+        ----------
+        current: datetime
+            The closing date, timezone.now() if None
+
+        Return
+        ------
+        closed: list
+            (auction id, winner username) tuples, "" for auctions without bids
+        """
+        best = Bid.objects.filter(auction=OuterRef("pk")).order_by(
+            "-price", "auction_date"
+        )
+        queryset = self.filter(status=True)
+        closed = list(
+            queryset.annotate(
+                winner_name=Coalesce(
+                    Subquery(best.values("user__username")[:1]), Value("")
+                )
+            ).values_list("id", "winner_name")
+        )
+        if closed:
+            queryset.update(
+                status=False,
+                closed_at=current or timezone.now(),
+                winner=Subquery(best.values("user")[:1]),
+                winning_bid=Subquery(best.values("id")[:1]),
+            )
+        return closed
+
+
 class Auction(models.Model):
     """
     A class used to represent an auction
@@ -54,32 +171,51 @@ class Auction(models.Model):
     status: boolean
         True if the auction is active
         False if not
-    remaining: str
-        The rest active time of an auction
-    winner: str
-        User that have won the auction
-    bids: Field
-        ManyToManyField to store all bids of an auction
-    comments: Field
-        ManyToManyField to store all comments of an auction
+    end_date: datetime
+        The date and time of the end of an auction, indexed with status
+    winner: User
+        ForeignKey of the User that has won the auction, None without bids
+    winning_bid: Bid
+        ForeignKey of the winning Bid, None without bids
+    bid_count: int
+        Number of bids placed on the auction
+    high_bidder: User
+        ForeignKey of the User with the highest bid, None without bids
+    last_bid_at: datetime
+        The date and time of the last bid, None without bids
+    last_comment_at: datetime
+        The date and time of the last comment, None without comments
+    closed_at: datetime
+        The date and time the auction was closed, None while it is open
+    bids: RelatedManager
+        All bids of an auction, reverse of Bid.auction
+    comments: RelatedManager
+        All comments of an auction, reverse of Comment.auction
 
     Methods
     -------
-    get_end(current, duration):
+    compute_end_date(creation_date, duration):
+        Return end date from a creation date and a duration
+
+    get_end_date():
         Return end date of an auction
 
-    update_remaining_time(current):
-        Return True self.remaining could be update
-        False if not and update self.status to False too
+    save():
+        Save the auction, end_date following its duration
+
+    is_active:
+        Return True if the auction is open and not ended
+        False if not
+
+    remaining:
+        Return the rest active time of an auction as a str
 
     is_valid_time(time):
         Return True if time is higher than current
         False if not
 
-    update_winner(bid):
-        Update the winner of the auction
-
     """
+
     HOUSE = "HOU"
     MOTORS = "MOT"
     PROPERTY = "PPT"
@@ -112,7 +248,7 @@ class Auction(models.Model):
 
     title = models.CharField(max_length=64)
     description = models.TextField(max_length=500, blank=True)
-    creation_date = models.DateTimeField(auto_now_add=True)
+    creation_date = models.DateTimeField(default=timezone.now, editable=False)
     image = models.URLField(null=True, blank=True, default="https://cdn.onlinewebfonts.com/svg/img_391144.png", )
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="seller")
     duration = models.IntegerField(choices=DURATION_CHOICES)
@@ -121,56 +257,140 @@ class Auction(models.Model):
     )
     price = models.DecimalField(max_digits=12, decimal_places=2, default=0.0)
     status = models.BooleanField(default=True)
-    remaining = models.CharField(max_length=32, blank=True)
-    winner = models.CharField(max_length=64, blank=True)
-    bids = models.ManyToManyField("Bid", blank=True, related_name="bids")
-    comments = models.ManyToManyField("Comment", blank=True, related_name="comments")
+    end_date = models.DateTimeField(editable=False)
+    winner = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="won",
+    )
+    winning_bid = models.ForeignKey(
+        "Bid",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="+",
+    )
+    bid_count = models.PositiveIntegerField(default=0, editable=False)
+    high_bidder = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="leading",
+    )
+    last_bid_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_comment_at = models.DateTimeField(null=True, blank=True, editable=False)
+    closed_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = AuctionQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["end_date"],
+                condition=models.Q(status=True),
+                name="auction_active_idx",
+            ),
+            models.Index(
+                fields=["category", "end_date"],
+                condition=models.Q(status=True),
+                name="auction_category_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.id}: {self.title} by {self.user}"
 
-    def get_end_date(self):
+    # Duration of the row as last read or written, to tell when it changes
+    _saved_duration = None
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_duration = instance.__dict__.get("duration")
+        return instance
+
+    def save(self, *args, **kwargs):
         """
-        Add self.duration to self.creation_date
+        Save the auction, computing end_date when it is created or its
+        duration changed
+        """
+        duration = self.__dict__.get("duration")
+        if self.end_date is None or duration != self._saved_duration:
+            self.end_date = self.get_end_date()
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "duration" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "end_date"}
+        super().save(*args, **kwargs)
+        self._saved_duration = duration
+
+    @staticmethod
+    def compute_end_date(creation_date, duration):
+        """
+        Add duration days to creation_date
 
         Parameters
         ----------
+        creation_date: datetime
+            The date and time of creation of an auction
+        duration: int
+            Corresponding to a DURATION_CHOICES
 
         Return
         ------
         end: datetime
             The end date of an auction
         """
-        end = self.creation_date + timedelta(days=self.duration)
-        return end
+        return creation_date + timedelta(days=duration)
 
-    def update_remaining_time(self, current):
+    def get_end_date(self):
         """
-        Update the remaining time of an auction
-
-        If the time is in the current time self.remaining is updated
-        If not self.status set to False to deactivate auction
+        Add self.duration to self.creation_date
 
         Parameters
         ----------
-        current : datetime
-            The current date
+
+        Return
+        ------
+        end: datetime
+            The end date of an auction
+        """
+        end = self.compute_end_date(self.creation_date, self.duration)
+        return end
+
+    @property
+    def is_active(self):
+        """
+        Check if the auction is open and its end date not passed
 
         Return
         ------
         True: boolean
-            if is time is in current
+            if bids can still be placed
         False: boolean
-            if time out of current
+            if not
+        """
+        return self.status and self.is_valid_time(self.end_date - timezone.now())
 
+    @property
+    def remaining(self):
         """
-        time = self.get_end_date() - current
-        if self.is_valid_time(time):
-            self.remaining = str(time)[:-7]
-            return True
-        else:
-            self.status = False
-            return False
+        Compute the remaining time of an auction at render time
+
+        Return
+        ------
+        remaining: str
+            The rest active time without microseconds, "Ended" if the auction is over
+        """
+        time = self.end_date - timezone.now()
+        if self.status and self.is_valid_time(time):
+            return str(time).split(".")[0]
+        return "Ended"
 
     def is_valid_time(self, time):
         """
@@ -192,23 +412,6 @@ class Auction(models.Model):
             return True
         return False
 
-    def update_winner(self, bid):
-        """
-        Set the winner of an auction
-
-        Parameters
-        ----------
-        bid: Bid
-            A Bid object
-
-        Return
-        ------
-        self.winner: str
-            Represent the username of the winner of an auction
-        """
-        self.winner = bid.user.username
-        return self.winner
-
 
 class Bid(models.Model):
     """
@@ -232,11 +435,20 @@ class Bid(models.Model):
     -------
 
     """
-    auction = models.ForeignKey(Auction, on_delete=models.CASCADE)
+    auction = models.ForeignKey(
+        Auction, on_delete=models.CASCADE, related_name="bids"
+    )
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     auction_date = models.DateTimeField(auto_now_add=True)
     price = models.DecimalField(max_digits=12, decimal_places=2, default=0.0)
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["auction", "-price", "auction_date"], name="bid_auction_price_idx"
+            ),
+        ]
+
     def __str__(self):
         return (
             f"{self.id}: {self.auction.title} by {self.user.username} at {self.price}"
@@ -267,11 +479,18 @@ class Comment(models.Model):
     -------
 
     """
-    auction = models.ForeignKey(Auction, on_delete=models.CASCADE)
+    auction = models.ForeignKey(
+        Auction, on_delete=models.CASCADE, related_name="comments"
+    )
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     title = models.CharField(max_length=64, default="New comment")
     date = models.DateField(auto_now_add=True)
     content = models.TextField(max_length=500)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["auction", "date"], name="comment_auction_date_idx"),
+        ]
+
     def __str__(self):
         return f"{self.id}: {self.user.username} {self.date}"
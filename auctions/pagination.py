@@ -0,0 +1,175 @@
+import heapq
+from datetime import datetime
+from itertools import islice
+
+from django.db.models import Q
+from django.utils.encoding import force_str
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from .shards import shard_querysets
+
+PAGE_SIZE = 20
+
+
+def encode_cursor(auction):
+    """
+    Build the cursor pointing after an auction
+
+    Parameters
+    ----------
+    auction: Auction or dict
+        The last Auction object of a page, or its values() row
+
+    Return
+    ------
+    cursor: str
+        The url safe representation of (end_date, id)
+    """
+    if isinstance(auction, dict):
+        raw = f"{auction['end_date'].isoformat()}|{auction['id']}"
+    else:
+        raw = f"{auction.end_date.isoformat()}|{auction.id}"
+    return urlsafe_base64_encode(raw.encode())
+
+
+def decode_cursor(cursor):
+    """
+    Read a cursor built by encode_cursor()
+
+    Parameters
+    ----------
+    cursor: str
+        The url safe representation of (end_date, id)
+
+    Return
+    ------
+    None: NoneType
+        if cursor is empty or malformed
+    tuple: datetime, int
+        end_date and id of the last auction of the previous page
+    """
+    if not cursor:
+        return None
+    try:
+        end_date, auction_id = force_str(urlsafe_base64_decode(cursor)).split("|")
+        return datetime.fromisoformat(end_date), int(auction_id)
+    except (TypeError, ValueError):
+        return None
+
+
+def page_queryset(queryset, cursor=None, page_size=PAGE_SIZE):
+    """
+    Restrict queryset to the auctions of one page, plus one to detect the next
+
+    The page starts right after the cursor with an indexed range condition
+    instead of an OFFSET, so every page costs the same
+
+    Parameters
+    ----------
+    queryset: AuctionQuerySet
+        The auctions to paginate
+    cursor: str
+        Cursor of the previous page, None for the first page
+    page_size: int
+        Number of auctions in a page
+
+    Return
+    ------
+    queryset: AuctionQuerySet
+        At most page_size + 1 auctions ordered by (end_date, id)
+    """
+    queryset = queryset.order_by("end_date", "id")
+    position = decode_cursor(cursor)
+    if position is not None:
+        end_date, auction_id = position
+        queryset = queryset.filter(
+            Q(end_date__gt=end_date) | Q(end_date=end_date, id__gt=auction_id)
+        )
+    return queryset[: page_size + 1]
+
+
+def sort_key(auction):
+    """
+    Return the (end_date, id) of an Auction object or of its values() row
+    """
+    if isinstance(auction, dict):
+        return auction["end_date"], auction["id"]
+    return auction.end_date, auction.id
+
+
+def merge_pages(pages, page_size=PAGE_SIZE):
+    """
+    Merge the pages read from each shard by page_queryset()
+
+    Parameters
+    ----------
+    pages: list
+        Lists of auctions, each one ordered by (end_date, id)
+
+    Return
+    ------
+    listings: list
+        The first page_size + 1 auctions of all pages in (end_date, id) order
+    """
+    if len(pages) == 1:
+        return pages[0]
+    return list(islice(heapq.merge(*pages, key=sort_key), page_size + 1))
+
+
+def fetch_page(queryset, cursor=None, page_size=PAGE_SIZE):
+    """
+    Read the auctions of one page, plus one to detect the next
+
+    With AUCTIONS_SHARDS a queryset not bound to a shard is read from every
+    shard, each shard returning its own page, and the pages are merged
+
+    Return
+    ------
+    listings: list
+        At most page_size + 1 auctions ordered by (end_date, id)
+    """
+    return merge_pages(
+        [
+            list(page_queryset(queryset, cursor, page_size))
+            for queryset in shard_querysets(queryset)
+        ],
+        page_size,
+    )
+
+
+def split_page(listings, page_size=PAGE_SIZE):
+    """
+    Cut the extra auction fetched by page_queryset()
+
+    Return
+    ------
+    tuple: list, str
+        list: the auctions of the page
+        str: the cursor of the next page, None if it is the last one
+    """
+    if len(listings) > page_size:
+        listings = listings[:page_size]
+        return listings, encode_cursor(listings[-1])
+    return listings, None
+
+
+def paginate(queryset, cursor=None, page_size=PAGE_SIZE):
+    """
+    Return one page of auctions ordered by (end_date, id)
+
+    Parameters
+    ----------
+    queryset: AuctionQuerySet
+        The auctions to paginate
+    cursor: str
+        Cursor of the previous page, None for the first page
+    page_size: int
+        Number of auctions in a page
+
+    Return
+    ------
+    tuple: list, str
+        list: the auctions of the page
+        str: the cursor of the next page, None if it is the last one
+    """
+    return split_page(fetch_page(queryset, cursor, page_size), page_size)
@@ -0,0 +1,133 @@
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .shards import (
+    current_shard,
+    get_shards,
+    is_sharded,
+    shard_for_category,
+    shard_for_id,
+)
+
+# Routing state of the current request, set by ReplicaPinMiddleware:
+# pinned sends every read to the primary, wrote records a write
+routing = ContextVar("routing", default=None)
+
+
+class PrimaryReplicaRouter:
+    """
+    A class used to send reads to the read replicas and writes to the primary
+
+    ...
+
+    Reads go to the primary when no replica is configured, inside a
+    transaction of the primary, or when the request is pinned to it after a
+    recent write of the same browser
+
+    Methods
+    -------
+    db_for_read(model, **hints):
+        Return a replica alias, or the primary one
+
+    db_for_write(model, **hints):
+        Return the primary alias and record the write
+
+    allow_relation(obj1, obj2, **hints):
+        Allow relations between objects of the primary and its replicas
+
+    allow_migrate(db, app_label, model_name=None, **hints):
+        Migrate the primary only, replicas are copies of it
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, "AUCTIONS_READ_REPLICAS", [])
+        state = routing.get()
+        if (
+            not replicas
+            or (state is not None and state["pinned"])
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = routing.get()
+        if state is not None:
+            state["wrote"] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *getattr(settings, "AUCTIONS_READ_REPLICAS", [])}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ShardRouter:
+    """
+    A class used to send auctions, bids, comments and watchlists to the
+    shard of their category
+
+    ...
+
+    The shard is the one of the instance the query comes from, else the
+    one of the auction id of the instance, else the one of the current
+    request, else for a new auction the one of its category. Other
+    queries are left to the next router, the default database holding
+    users, sessions and every table when AUCTIONS_SHARDS is empty
+
+    Methods
+    -------
+    db_for_read(model, **hints):
+        Return the shard of a sharded model or None
+
+    db_for_write(model, **hints):
+        Return the shard of a sharded model or None
+
+    allow_relation(obj1, obj2, **hints):
+        Allow relations between the shards and the default database
+
+    allow_migrate(db, app_label, model_name=None, **hints):
+        Migrate every table on the shards, users being copied there
+    """
+
+    def get_shard(self, model, hints):
+        if not is_sharded(model):
+            return None
+        instance = hints.get("instance")
+        if instance is not None:
+            if instance._state.db in get_shards():
+                return instance._state.db
+            if instance._meta.model_name == "auction":
+                auction_id = instance.pk
+            else:
+                auction_id = getattr(instance, "auction_id", None)
+            if auction_id and shard_for_id(auction_id):
+                return shard_for_id(auction_id)
+        shard = current_shard.get()
+        if shard is None and getattr(instance, "category", None):
+            shard = shard_for_category(instance.category)
+        return shard
+
+    def db_for_read(self, model, **hints):
+        return self.get_shard(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self.get_shard(model, hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        shards = get_shards()
+        if obj1._state.db in shards or obj2._state.db in shards:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in get_shards():
+            return True
+        return None
@@ -0,0 +1,153 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Auction
+from .pagination import PAGE_SIZE
+from .shards import group_by_shard, shard_querysets
+
+WORD = re.compile(r"\w+")
+
+
+def build_match(query):
+    """
+    Turn free text into an FTS5 query matching all its words
+
+    Words are quoted so FTS5 operators typed by users are not interpreted,
+    the last word also matches as a prefix
+
+    Parameters
+    ----------
+    query: str
+        The text typed by the user
+
+    Return
+    ------
+    None: NoneType
+        if query has no word
+    match: str
+        The FTS5 MATCH expression
+    """
+    words = WORD.findall(query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def rank_matches(connection, match, category, active_only, limit, offset):
+    """
+    Search the auctions_auction_fts table of one SQLite database
+
+    Return
+    ------
+    rows: list
+        (bm25 score, id) tuples, the best ranked first
+    """
+    sql = [
+        "SELECT bm25(auctions_auction_fts, 10.0, 1.0) AS score, a.id",
+        "FROM auctions_auction_fts",
+        "JOIN auctions_auction a ON a.id = auctions_auction_fts.rowid",
+        "WHERE auctions_auction_fts MATCH %s",
+    ]
+    params = [match]
+    if category:
+        sql.append("AND a.category = %s")
+        params.append(category)
+    if active_only:
+        sql.append("AND a.status AND a.end_date > %s")
+        params.append(connection.ops.adapt_datetimefield_value(timezone.now()))
+    sql.append("ORDER BY score, a.id LIMIT %s OFFSET %s")
+    params += [limit, offset]
+    with connection.cursor() as cursor:
+        cursor.execute(" ".join(sql), params)
+        return cursor.fetchall()
+
+
+def rank_contains(queryset, query, category, active_only, limit, offset):
+    """
+    Search title and description with LIKE, on databases without FTS5
+
+    Return
+    ------
+    rows: list
+        (-id, id) tuples, the newest auction first
+    """
+    queryset = queryset.filter(
+        Q(title__icontains=query) | Q(description__icontains=query)
+    )
+    if category:
+        queryset = queryset.filter(category=category)
+    if active_only:
+        queryset = queryset.active()
+    ids = queryset.order_by("-id").values_list("id", flat=True)
+    return [(-auction_id, auction_id) for auction_id in ids[offset : offset + limit]]
+
+
+def search_auctions(
+    query, category=None, active_only=True, page=1, page_size=PAGE_SIZE
+):
+    """
+    Return one page of auctions matching query, the best ranked first
+
+    On SQLite the auctions_auction_fts table is searched and ranked with
+    bm25, a match in the title counting 10 times a match in the description.
+    With AUCTIONS_SHARDS every shard returns its matches up to the end of
+    the page and they are merged by score, each shard scoring with the
+    statistics of its own table
+
+    Parameters
+    ----------
+    query: str
+        The text typed by the user
+    category: str
+        Corresponding to a CATEGORY_CHOICES, None for every category
+    active_only: boolean
+        True to keep only active auctions
+    page: int
+        Number of the page, starting at 1
+    page_size: int
+        Number of auctions in a page
+
+    Return
+    ------
+    tuple: list, boolean
+        list: the auctions of the page with their seller
+        boolean: True if there is a next page
+    """
+    match = build_match(query)
+    if match is None:
+        return [], False
+    offset = (page - 1) * page_size
+    querysets = shard_querysets(Auction.objects.all())
+    if len(querysets) == 1:
+        limit, skip = page_size + 1, offset
+    else:
+        limit, skip = offset + page_size + 1, 0
+    rows = []
+    for queryset in querysets:
+        connection = connections[queryset.db]
+        if connection.vendor == "sqlite":
+            rows += rank_matches(connection, match, category, active_only, limit, skip)
+        else:
+            rows += rank_contains(queryset, query, category, active_only, limit, skip)
+    rows.sort()
+    if len(querysets) > 1:
+        rows = rows[offset:]
+    ids = [auction_id for _, auction_id in rows[: page_size + 1]]
+
+    has_next = len(ids) > page_size
+    ids = ids[:page_size]
+    auctions = {}
+    for alias, shard_ids in group_by_shard(ids).items():
+        auctions.update(
+            Auction.objects.using(alias)
+            .select_related("user", "winner")
+            .in_bulk(shard_ids)
+        )
+    return [
+        auctions[auction_id] for auction_id in ids if auction_id in auctions
+    ], has_next
@@ -0,0 +1,176 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# Auction ids of the shard at position i start at (i + 1) << ID_BITS, so the
+# shard of an auction is found from its id alone and ids stay unique across
+# shards. Seven shards of 268 million auctions fit in a 32 bit AutoField
+ID_BITS = 28
+MAX_SHARDS = 7
+
+# Models stored on the shard of their auction, users stay in the default
+# database and are copied to every shard
+SHARDED_MODELS = {"auction", "bid", "comment", "user_watchlist"}
+SEQUENCE_TABLES = ("auctions_auction", "auctions_bid", "auctions_comment")
+
+# Shard of the current request, set by ShardMiddleware when the url names
+# an auction or a category
+current_shard = ContextVar("current_shard", default=None)
+
+
+def get_shards():
+    """
+    Return AUCTIONS_SHARDS, a dict of shard alias to its category codes
+    """
+    return getattr(settings, "AUCTIONS_SHARDS", {})
+
+
+def is_sharded(model):
+    """
+    Return True if the rows of model live on the shards
+    """
+    return (
+        bool(get_shards())
+        and model._meta.app_label == "auctions"
+        and model._meta.model_name in SHARDED_MODELS
+    )
+
+
+def shard_for_category(category):
+    """
+    Return the alias of the shard holding category, None if there is none
+    """
+    for alias, categories in get_shards().items():
+        if category in categories:
+            return alias
+    return None
+
+
+def shard_for_id(auction_id):
+    """
+    Return the alias of the shard holding the auction auction_id
+
+    Parameters
+    ----------
+    auction_id: int
+        Represent id of an Auction object
+
+    Return
+    ------
+    None: NoneType
+        if the id is not in the range of a shard
+    alias: str
+        if it is
+    """
+    aliases = list(get_shards())
+    position = (auction_id >> ID_BITS) - 1
+    if 0 <= position < len(aliases):
+        return aliases[position]
+    return None
+
+
+def group_by_shard(auction_ids):
+    """
+    Split auction ids by the shard holding them
+
+    Parameters
+    ----------
+    auction_ids: iterable
+        Ids of Auction objects
+
+    Return
+    ------
+    groups: dict
+        Shard alias to its ids, None to every id without AUCTIONS_SHARDS.
+        Ids outside the range of every shard are left out
+    """
+    if not get_shards():
+        return {None: list(auction_ids)}
+    groups = {}
+    for auction_id in auction_ids:
+        alias = shard_for_id(auction_id)
+        if alias is not None:
+            groups.setdefault(alias, []).append(auction_id)
+    return groups
+
+
+def first_id(alias):
+    """
+    Return the lowest id given by the shard alias
+    """
+    return (list(get_shards()).index(alias) + 1) << ID_BITS
+
+
+@contextmanager
+def use_shard(alias):
+    """
+    Send the queries on sharded models without an explicit database to alias
+    """
+    token = current_shard.set(alias)
+    try:
+        yield
+    finally:
+        current_shard.reset(token)
+
+
+def shard_querysets(queryset):
+    """
+    Return a copy of queryset for each shard
+
+    Parameters
+    ----------
+    queryset: QuerySet
+        A queryset of any model
+
+    Return
+    ------
+    querysets: list
+        queryset alone if it is not sharded, is bound to a database or runs
+        in a request already bound to a shard, one copy per shard otherwise
+    """
+    if (
+        not is_sharded(queryset.model)
+        or queryset._db is not None
+        or current_shard.get() is not None
+    ):
+        return [queryset]
+    return [queryset.using(alias) for alias in get_shards()]
+
+
+def prepare_shard(connection):
+    """
+    Start the id sequences of a migrated shard at first_id()
+
+    Parameters
+    ----------
+    connection: DatabaseWrapper
+        The connection of the shard, a SQLite database
+    """
+    start = first_id(connection.alias) - 1
+    with connection.cursor() as cursor:
+        for table in SEQUENCE_TABLES:
+            cursor.execute(
+                "UPDATE sqlite_sequence SET seq = MAX(seq, %s) WHERE name = %s",
+                [start, table],
+            )
+            if not cursor.rowcount:
+                cursor.execute(
+                    "INSERT INTO sqlite_sequence (name, seq) VALUES (%s, %s)",
+                    [table, start],
+                )
+
+
+def copy_user(user):
+    """
+    Write the columns of user to every shard, creating its row if needed
+    """
+    values = {
+        field.attname: getattr(user, field.attname)
+        for field in user._meta.concrete_fields
+        if not field.primary_key
+    }
+    for alias in get_shards():
+        type(user)._base_manager.using(alias).update_or_create(
+            pk=user.pk, defaults=values
+        )
@@ -0,0 +1,81 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from .autocomplete import title_index
+from .cache import forget_user
+from .metrics import record_query
+from .models import Auction, User
+from .shards import copy_user, get_shards, prepare_shard
+
+
+@receiver(post_save, sender=Auction)
+def index_title(sender, instance, **kwargs):
+    """
+    Keep the title suggestions in line with an auction created or closed with save()
+    """
+    if instance.status:
+        change = partial(
+            title_index.add, instance.id, instance.title, instance.end_date
+        )
+    else:
+        change = partial(title_index.remove, instance.id)
+    transaction.on_commit(change)
+
+
+@receiver(post_save, sender=User)
+def copy_user_to_shards(sender, instance, using, **kwargs):
+    """
+    Keep the copies of a user on the shards in line with the default database
+    """
+    if get_shards() and using == DEFAULT_DB_ALIAS:
+        copy_user(instance)
+
+
+@receiver(post_migrate)
+def start_shard_sequences(sender, using, **kwargs):
+    """
+    Move the id sequences of a migrated shard to its own range
+    """
+    if sender.name == "auctions" and using in get_shards():
+        prepare_shard(connections[using])
+
+
+@receiver([post_save, post_delete], sender=User)
+def uncache_user(sender, instance, **kwargs):
+    """
+    Drop the cached copy of a user edited, logged in or deleted
+    """
+    forget_user(instance.pk)
+
+
+def pragma_statements(pragmas):
+    """
+    Return the PRAGMA statements setting pragmas, a dict of name to value
+    """
+    return [f"PRAGMA {name} = {value}" for name, value in pragmas.items()]
+
+
+@receiver(connection_created)
+def configure_sqlite(sender, connection, **kwargs):
+    """
+    Apply settings.SQLITE_PRAGMAS to a new SQLite connection
+    """
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        for statement in pragma_statements(getattr(settings, "SQLITE_PRAGMAS", {})):
+            cursor.execute(statement)
+
+
+@receiver(connection_created)
+def time_queries(sender, connection, **kwargs):
+    """
+    Count and time the queries of a new connection for MetricsMiddleware
+    """
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,81 @@
+import hashlib
+from uuid import uuid4
+
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from auctions.cache import FRAGMENT_TIMEOUT, record_fragment_lookups
+
+register = template.Library()
+
+# Stands for the remaining time in cached cards, it changes every second
+REMAINING_MARKER = f"<!--remaining-{uuid4().hex}-->"
+
+
+def card_key(listing):
+    """
+    Return the cache key of the card of listing
+
+    The key is made of the columns shown by the card and of those changed
+    by a bid, comment or closure, as loaded with the row, so an outdated
+    card is never read whatever process or cache wrote it
+    """
+    state = (
+        listing.title,
+        listing.description,
+        listing.image,
+        listing.user.username,
+        listing.price,
+        listing.bid_count,
+        listing.last_comment_at,
+        listing.closed_at,
+        listing.status,
+        listing.is_active,
+        listing.winner_id,
+    )
+    digest = hashlib.md5(repr(state).encode(), usedforsecurity=False).hexdigest()
+    return f"auctions:card:{listing.id}:{digest}"
+
+
+@register.simple_tag
+def listing_cards(listings):
+    """
+    Render the cards of listings, from the cache when possible
+
+    A card is cached under the auction id and the state of its row, so a
+    bid, comment, closure or edit of the auction makes the next render
+    miss. The remaining time is filled in after the cache lookup
+
+    Parameters
+    ----------
+    listings: list
+        Auction objects with their seller selected
+
+    Return
+    ------
+    html: SafeString
+        The cards of all listings
+    """
+    listings = list(listings)
+    keys = [card_key(listing) for listing in listings]
+    cached = cache.get_many(keys)
+    missing = {}
+    cards = []
+    for listing, key in zip(listings, keys):
+        card = cached.get(key)
+        if card is None:
+            card = render_to_string(
+                "auctions/listing_card.html",
+                {"listing": listing, "remaining": mark_safe(REMAINING_MARKER)},
+            )
+            missing[key] = card
+        cards.append(
+            card.replace(REMAINING_MARKER, conditional_escape(listing.remaining))
+        )
+    if missing:
+        cache.set_many(missing, FRAGMENT_TIMEOUT)
+    record_fragment_lookups(len(listings) - len(missing), len(missing))
+    return mark_safe("".join(cards))
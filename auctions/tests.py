@@ -1,3 +1,1354 @@
-from django.test import TestCase
+import asyncio
+import json
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager, redirect_stdout
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from random import Random
+from statistics import quantiles
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, connections
+from django.db.models import Q
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from commerce.settings import conn_max_age
+
+from . import events
+from .autocomplete import PrefixIndex, title_index
+from .cache import get_fragment_stats
+from .metrics import OTHER_VIEW, MetricStore
+from .middleware import PIN_COOKIE, ReplicaPinMiddleware
+from .models import Auction, Bid, Comment, User
+from .routers import PrimaryReplicaRouter, ShardRouter, routing
+from .search import search_auctions
+from .shards import shard_for_category, shard_for_id, shard_querysets, use_shard
+from .templatetags.auctions_extras import listing_cards
+from .views import place_bid
+
+PERF_REPORT_PATH = os.path.join(settings.BASE_DIR, "perf_report.json")
+
+# For the classes checking query plans and query counts of a single database,
+# run without shards even under commerce.shard_test_settings. ShardTests
+# covers the shards
+unsharded = override_settings(AUCTIONS_SHARDS={})
+
+
+@unsharded
+class QueryPlanTests(TestCase):
+    """
+    Check with EXPLAIN QUERY PLAN that the hot queries use an index
+
+    A full table scan shows up as "SCAN <table>" without "USING INDEX"
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("seller", "seller@example.com", "pwd")
+        cls.auction = Auction.objects.create(
+            title="Laptop", user=cls.user, duration=Auction.SEVEN, price=10
+        )
+
+    def get_plan(self, queryset):
+        sql, params = queryset.query.get_compiler(connection=connection).as_sql()
+        with connection.cursor() as cursor:
+            cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertUsesIndex(self, queryset, index):
+        plan = self.get_plan(queryset)
+        self.assertTrue(
+            any(index in step for step in plan), f"{index} not used in {plan}"
+        )
+        for step in plan:
+            if step.startswith("SCAN"):
+                self.assertIn("INDEX", step, f"table scan in {plan}")
+
+    def test_active_listings(self):
+        queryset = Auction.objects.active().order_by("end_date", "id")[:20]
+        self.assertUsesIndex(queryset, "auction_active_idx")
+
+    def test_category_listings(self):
+        queryset = (
+            Auction.objects.active()
+            .filter(category=Auction.BOOK)
+            .order_by("end_date", "id")[:20]
+        )
+        self.assertUsesIndex(queryset, "auction_category_idx")
+
+    def test_expired_auctions(self):
+        queryset = Auction.objects.filter(status=True, end_date__lte=timezone.now())
+        self.assertUsesIndex(queryset, "auction_active_idx")
+
+    def test_won_auctions(self):
+        queryset = self.user.won.order_by("end_date", "id")[:20]
+        self.assertUsesIndex(queryset, "auctions_auction_winner_id")
+
+    def test_highest_bid(self):
+        queryset = Bid.objects.filter(auction=self.auction).order_by(
+            "-price", "auction_date"
+        )[:1]
+        self.assertUsesIndex(queryset, "bid_auction_price_idx")
+
+    def test_auction_comments(self):
+        queryset = Comment.objects.filter(auction=self.auction).order_by("date")
+        self.assertUsesIndex(queryset, "comment_auction_date_idx")
+
+    def test_next_page(self):
+        end_date = self.auction.end_date
+        queryset = (
+            Auction.objects.active()
+            .filter(Q(end_date__gt=end_date) | Q(end_date=end_date, id__gt=1))
+            .order_by("end_date", "id")[:20]
+        )
+        self.assertUsesIndex(queryset, "auction_active_idx")
+
+
+@unsharded
+class SearchTests(TestCase):
+    """
+    Check the full text index follows the auctions and the search ranks,
+    filters and pages its matches
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("seller", "seller@example.com", "pwd")
+
+    def create(self, title, description="", **fields):
+        return Auction.objects.create(
+            title=title,
+            description=description,
+            user=self.user,
+            duration=Auction.SEVEN,
+            **fields,
+        )
+
+    def get_indexed(self, word):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT rowid FROM auctions_auction_fts "
+                "WHERE auctions_auction_fts MATCH %s",
+                [word],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def get_titles(self, query, **options):
+        listings, _ = search_auctions(query, **options)
+        return [listing.title for listing in listings]
+
+    def test_triggers(self):
+        auction = self.create("Brass trumpet", "Barely used")
+        self.assertEqual(self.get_indexed("trumpet"), [auction.id])
+        self.assertEqual(self.get_indexed("barely"), [auction.id])
+        auction.title = "Silver flute"
+        auction.save()
+        self.assertEqual(self.get_indexed("trumpet"), [])
+        self.assertEqual(self.get_indexed("flute"), [auction.id])
+        Auction.objects.filter(pk=auction.pk).update(description="Like new")
+        self.assertEqual(self.get_indexed("barely"), [])
+        auction.delete()
+        self.assertEqual(self.get_indexed("flute"), [])
+
+    def test_ranking(self):
+        self.create("Red bike", "Fast")
+        self.create("Helmet", "Fits any bike")
+        self.assertEqual(self.get_titles("bike"), ["Red bike", "Helmet"])
+        self.assertEqual(self.get_titles("bikes"), ["Red bike", "Helmet"])
+        self.assertEqual(self.get_titles("red bi"), ["Red bike"])
+        self.assertEqual(self.get_titles('"red" -bike'), ["Red bike"])
+        self.assertEqual(self.get_titles("?!"), [])
+
+    def test_filters(self):
+        self.create("Desk lamp", category=Auction.HOUSE)
+        self.create("Lamp cable", category=Auction.INFORMATION_TECHNOLOGY)
+        self.create("Closed lamp", status=False)
+        expired = self.create("Old lamp")
+        Auction.objects.filter(pk=expired.pk).update(
+            end_date=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertEqual(self.get_titles("lamp", category=Auction.HOUSE), ["Desk lamp"])
+        self.assertCountEqual(self.get_titles("lamp"), ["Desk lamp", "Lamp cable"])
+        self.assertCountEqual(
+            self.get_titles("lamp", active_only=False),
+            ["Desk lamp", "Lamp cable", "Closed lamp", "Old lamp"],
+        )
+
+    def test_pagination(self):
+        for i in range(5):
+            self.create(f"Chair {i}")
+        pages = [search_auctions("chair", page=page, page_size=2) for page in (1, 2, 3)]
+        self.assertEqual([has_next for _, has_next in pages], [True, True, False])
+        titles = [listing.title for listings, _ in pages for listing in listings]
+        self.assertCountEqual(titles, [f"Chair {i}" for i in range(5)])
+        response = self.client.get(reverse("search"), {"q": "chair"})
+        self.assertEqual(len(response.context["listings"]), 5)
+        self.assertIsNone(response.context["next_page"])
+
+    def test_fallback(self):
+        self.create("Red bike", category=Auction.HOBBIES)
+        newest = self.create("Blue bike", "Light frame")
+        self.create("Helmet", "For any bike", status=False)
+        with mock.patch.object(connection, "vendor", "postgresql"):
+            self.assertEqual(self.get_titles("bike"), ["Blue bike", "Red bike"])
+            self.assertEqual(
+                self.get_titles("bike", category=Auction.HOBBIES), ["Red bike"]
+            )
+            self.assertEqual(
+                self.get_titles("BIKE", active_only=False),
+                ["Helmet", "Blue bike", "Red bike"],
+            )
+            listings, has_next = search_auctions("bike", page_size=1)
+            self.assertEqual(listings, [newest])
+            self.assertTrue(has_next)
+
+
+class SuggestTests(TestCase):
+    """
+    Check the title suggestions follow created and closed auctions without
+    querying the database
+    """
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("seller", "seller@example.com", "pwd")
+        cls.bike = Auction.objects.create(
+            title="Red bike", user=cls.user, duration=Auction.SEVEN, price=10
+        )
+        cls.book = Auction.objects.create(
+            title="Old book",
+            user=cls.user,
+            duration=Auction.SEVEN,
+            price=10,
+            status=False,
+        )
+
+    def setUp(self):
+        title_index.loaded = False
+        title_index.load()
+
+    @contextmanager
+    def run_on_commit(self):
+        """
+        Run the on_commit callbacks of every database, shards included
+        """
+        with ExitStack() as stack:
+            for alias in self.databases:
+                stack.enter_context(
+                    self.captureOnCommitCallbacks(using=alias, execute=True)
+                )
+            yield
+
+    def get_titles(self, prefix):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse("suggest"), {"q": prefix})
+        return [suggestion["title"] for suggestion in response.json()["suggestions"]]
+
+    def test_prefix(self):
+        self.assertEqual(self.get_titles("RE"), ["Red bike"])
+        self.assertEqual(self.get_titles("bi"), ["Red bike"])
+        self.assertEqual(self.get_titles("old"), [])
+        self.assertEqual(self.get_titles(""), [])
+
+    def test_create_and_close(self):
+        self.client.force_login(self.user)
+        data = {
+            "title": "Blue bike",
+            "description": "Description",
+            "image": "https://example.com/image.png",
+            "category": Auction.BOOK,
+            "duration": Auction.SEVEN,
+            "price": "10",
+        }
+        with self.run_on_commit():
+            self.client.post(reverse("listings_create"), data)
+        self.assertCountEqual(self.get_titles("bi"), ["Blue bike", "Red bike"])
+        with self.run_on_commit():
+            self.client.post(reverse("close_listing", args=[self.bike.id]))
+        self.assertEqual(self.get_titles("bi"), ["Blue bike"])
+
+    def test_reload(self):
+        # Changes made by another process, without the signals of this one
+        for auction, status in ((self.bike, False), (self.book, True)):
+            Auction.objects.using(auction._state.db).filter(pk=auction.pk).update(
+                status=status
+            )
+        self.assertEqual(self.get_titles("bi"), ["Red bike"])
+        # One pass of the reloader loop, stopped on its second sleep
+        sleep = mock.patch("auctions.autocomplete.time.sleep", side_effect=[None])
+        with sleep as patched, self.assertRaises(StopIteration):
+            title_index.reload_every(60)
+        patched.assert_called_with(60)
+        self.assertEqual(self.get_titles("bi"), [])
+        self.assertEqual(self.get_titles("ol"), ["Old book"])
+
+    def test_first_load(self):
+        index = PrefixIndex()
+        # Already running, no thread is started
+        index.reloader = threading.current_thread()
+        reads = []
+
+        def load():
+            reads.append(threading.current_thread())
+            time.sleep(0.05)
+            index.loaded = True
+
+        with mock.patch.object(index, "load", load):
+            threads = [threading.Thread(target=index.ensure_loaded) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(reads), 1)
+
+
+class EndDateTests(TestCase):
+    """
+    Check end_date follows the creation date and the duration of an auction
+    """
+
+    databases = "__all__"
+
+    def test_duration_change(self):
+        user = User.objects.create_user("seller", "seller@example.com", "pwd")
+        auction = Auction.objects.create(title="Lamp", user=user, duration=Auction.ONE)
+        self.assertEqual(auction.end_date, auction.creation_date + timedelta(days=1))
+        auctions = Auction.objects.using(auction._state.db)
+
+        auction = auctions.get(pk=auction.pk)
+        auction.title = "Desk lamp"
+        auction.save()
+        self.assertEqual(auction.end_date, auction.creation_date + timedelta(days=1))
+
+        auction.duration = Auction.SEVEN
+        auction.save()
+        auction = auctions.get(pk=auction.pk)
+        self.assertEqual(auction.end_date, auction.creation_date + timedelta(days=7))
+
+        auction.duration = Auction.THREE
+        auction.save(update_fields=["duration"])
+        auction = auctions.get(pk=auction.pk)
+        self.assertEqual(auction.end_date, auction.creation_date + timedelta(days=3))
+
+        # A save without a duration change keeps an end date moved by update()
+        ended = timezone.now() - timedelta(seconds=1)
+        auctions.filter(pk=auction.pk).update(end_date=ended)
+        auction = auctions.get(pk=auction.pk)
+        auction.save()
+        self.assertEqual(auctions.get(pk=auction.pk).end_date, ended)
+
+
+class BidTests(TestCase):
+    """
+    Check a bid is accepted only above the price of an active auction and
+    updates its bid summary
+    """
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller", "seller@example.com", "pwd")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pwd")
+        cls.auction = Auction.objects.create(
+            title="Laptop", user=cls.seller, duration=Auction.SEVEN, price=10
+        )
+
+    def get_auction(self):
+        return Auction.objects.using(self.auction._state.db).get(pk=self.auction.pk)
+
+    def test_higher_bid(self):
+        before = timezone.now()
+        self.assertTrue(place_bid(Decimal("12.50"), self.auction, self.bidder))
+        auction = self.get_auction()
+        self.assertEqual(auction.price, Decimal("12.50"))
+        self.assertEqual(auction.bid_count, 1)
+        self.assertEqual(auction.high_bidder, self.bidder)
+        self.assertGreaterEqual(auction.last_bid_at, before)
+        self.assertEqual(self.auction.price, Decimal("12.50"))
+        bids = Bid.objects.using(self.auction._state.db).filter(auction=auction)
+        self.assertEqual([bid.price for bid in bids], [Decimal("12.50")])
+
+    def test_equal_or_lower_bid(self):
+        for price in ("10", "9.99"):
+            self.assertFalse(place_bid(Decimal(price), self.auction, self.bidder))
+        auction = self.get_auction()
+        self.assertEqual(auction.price, Decimal("10"))
+        self.assertEqual(auction.bid_count, 0)
+        self.assertIsNone(auction.high_bidder)
+        self.assertIsNone(auction.last_bid_at)
+        self.assertFalse(Bid.objects.using(self.auction._state.db).exists())
+
+    def test_closed_or_expired(self):
+        auctions = Auction.objects.using(self.auction._state.db)
+        auctions.filter(pk=self.auction.pk).update(
+            end_date=timezone.now() - timedelta(seconds=1)
+        )
+        self.assertFalse(place_bid(Decimal("20"), self.auction, self.bidder))
+        auctions.filter(pk=self.auction.pk).update(
+            end_date=timezone.now() + timedelta(days=1), status=False
+        )
+        self.assertFalse(place_bid(Decimal("20"), self.auction, self.bidder))
+        self.assertEqual(self.get_auction().bid_count, 0)
+        self.assertFalse(Bid.objects.using(self.auction._state.db).exists())
+
+
+class ExpiryTests(TestCase):
+    """
+    Check expire_auctions closes the auctions ended by now only, following
+    their end dates in the database
+    """
+
+    databases = "__all__"
+
+    def setUp(self):
+        user = User.objects.create_user("seller", "seller@example.com", "pwd")
+        current = timezone.now()
+        self.auctions = {}
+        for title, delta in (("ended", -1), ("extended", 3600)):
+            auction = Auction.objects.create(
+                title=title, user=user, duration=Auction.SEVEN, price=10
+            )
+            Auction.objects.using(auction._state.db).filter(pk=auction.pk).update(
+                end_date=current + timedelta(seconds=delta)
+            )
+            self.auctions[title] = auction
+
+    def get_status(self, title):
+        auction = self.auctions[title]
+        return Auction.objects.using(auction._state.db).get(pk=auction.pk).status
+
+    def test_once(self):
+        stdout = StringIO()
+        call_command("expire_auctions", once=True, stdout=stdout)
+        self.assertEqual(stdout.getvalue(), "1 auction(s) closed\n")
+        self.assertFalse(self.get_status("ended"))
+        self.assertTrue(self.get_status("extended"))
+
+    def test_sleep_until_next_end(self):
+        sleep = "auctions.management.commands.expire_auctions.time.sleep"
+        with mock.patch(sleep, side_effect=KeyboardInterrupt) as patched:
+            with self.assertRaises(KeyboardInterrupt):
+                call_command("expire_auctions", refresh=7200, stdout=StringIO())
+        self.assertFalse(self.get_status("ended"))
+        self.assertTrue(self.get_status("extended"))
+        self.assertAlmostEqual(patched.call_args.args[0], 3600, delta=60)
+
+
+@unsharded
+class SeedTests(TestCase):
+    """
+    Check seed_auctions gives each auction increasing bids dated during
+    the auction
+    """
+
+    def test_bids(self):
+        call_command(
+            "seed_auctions",
+            users=5,
+            auctions=20,
+            bids=300,
+            comments=5,
+            watchlist=1,
+            seed=1,
+            stdout=StringIO(),
+        )
+        current = timezone.now()
+        auctions = Auction.objects.filter(bid_count__gt=0).prefetch_related("bids")
+        self.assertTrue(auctions)
+        for auction in auctions:
+            bids = sorted(auction.bids.all(), key=lambda bid: bid.auction_date)
+            prices = [bid.price for bid in bids]
+            self.assertEqual(prices, sorted(set(prices)))
+            self.assertEqual(auction.price, prices[-1])
+            self.assertEqual(auction.bid_count, len(bids))
+            self.assertGreaterEqual(bids[0].auction_date, auction.creation_date)
+            self.assertLessEqual(bids[-1].auction_date, min(auction.end_date, current))
+
+
+class TransferTests(TestCase):
+    """
+    Check export_auctions writes what import_auctions reads back, the bad
+    rows of a file being reported and skipped
+    """
+
+    databases = "__all__"
+
+    BAD_ROWS = {
+        "ndjson": ["{not json", '{"seller": "nobody", "title": "Lost", "duration": 7}'],
+        "csv": [
+            "99,seller,Lamp,,,XXX,7,1,2024-01-01T00:00:00+00:00,,True,0,",
+            "99,nobody,Lamp,,,HOU,7,1,2024-01-01T00:00:00+00:00,,True,0,",
+        ],
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("seller", "seller@example.com", "pwd")
+        for title, category, price in [
+            ("Guitar", Auction.MUSIC, "120.50"),
+            ("Sofa, blue", Auction.HOUSE, "80"),
+        ]:
+            Auction.objects.create(
+                title=title,
+                description='Said "like new"',
+                user=cls.user,
+                duration=Auction.SEVEN,
+                category=category,
+                price=Decimal(price),
+            )
+
+    def get_rows(self):
+        rows = []
+        for queryset in shard_querysets(Auction.objects.order_by("id")):
+            rows += queryset.values_list(
+                "title", "description", "category", "duration", "price", "user"
+            )
+        return rows
+
+    def test_round_trip(self):
+        exported = self.get_rows()
+        for fmt, bad_rows in self.BAD_ROWS.items():
+            with self.subTest(fmt=fmt):
+                directory = tempfile.mkdtemp()
+                self.addCleanup(shutil.rmtree, directory)
+                path = os.path.join(directory, f"auctions.{fmt}")
+                stdout = StringIO()
+                call_command("export_auctions", path, stdout=stdout)
+                self.assertIn("2 auction(s) exported", stdout.getvalue())
+                with open(path, "a", encoding="utf-8") as file:
+                    file.write("\n".join(bad_rows) + "\n")
+
+                for queryset in shard_querysets(Auction.objects.all()):
+                    queryset.delete()
+                stdout, stderr = StringIO(), StringIO()
+                call_command("import_auctions", path, stdout=stdout, stderr=stderr)
+                self.assertIn("2 auction(s) imported, 2 rejected", stdout.getvalue())
+                self.assertEqual(len(stderr.getvalue().splitlines()), 2)
+                self.assertEqual(self.get_rows(), exported)
+
+    def test_report_on_stderr(self):
+        stdout, stderr = StringIO(), StringIO()
+        with redirect_stdout(StringIO()) as rows:
+            call_command("export_auctions", "-", stdout=stdout, stderr=stderr)
+        self.assertEqual(len(rows.getvalue().splitlines()), 2)
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertIn("2 auction(s) exported", stderr.getvalue())
+
+
+class FragmentCacheTests(TestCase):
+    """
+    Check a listing card is served from the cache until a bid, comment or
+    closure changes its auction
+    """
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller", "seller@example.com", "pwd")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pwd")
+        cls.auction = Auction.objects.create(
+            title="Laptop", user=cls.seller, duration=Auction.SEVEN, price=10
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def render_card(self):
+        """
+        Render the card of the auction and return True on a cache miss
+        """
+        listing = (
+            Auction.objects.using(self.auction._state.db)
+            .select_related("user", "winner")
+            .get(pk=self.auction.pk)
+        )
+        misses = get_fragment_stats()["misses"]
+        html = listing_cards([listing])
+        self.assertIn("Laptop", html)
+        return get_fragment_stats()["misses"] > misses
+
+    def test_changes(self):
+        url = reverse("listing_view", args=[self.auction.id])
+        self.assertTrue(self.render_card())
+        self.assertFalse(self.render_card())
+
+        self.client.force_login(self.bidder)
+        self.client.post(url, {"bid": "", "price": "20"})
+        self.assertTrue(self.render_card())
+        self.assertFalse(self.render_card())
+
+        self.client.post(url, {"comment": "", "title": "Hi", "content": "Hello"})
+        self.assertTrue(self.render_card())
+        self.assertFalse(self.render_card())
+
+        self.client.force_login(self.seller)
+        self.client.post(reverse("close_listing", args=[self.auction.id]))
+        self.assertTrue(self.render_card())
+        self.assertFalse(self.render_card())
+
+
+class WatchlistTests(TestCase):
+    """
+    Check the watchlist badge follows the auctions added and removed
+    """
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("bidder", "bidder@example.com", "pwd")
+        cls.auctions = [
+            Auction.objects.create(
+                title=title, user=cls.user, duration=Auction.SEVEN, category=category
+            )
+            for title, category in [
+                ("Laptop", Auction.INFORMATION_TECHNOLOGY),
+                ("Guitar", Auction.MUSIC),
+            ]
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def test_badge(self):
+        self.client.force_login(self.user)
+        for timeout in (0, 3600):
+            with self.subTest(timeout=timeout), self.settings(
+                AUCTIONS_WATCHLIST_CACHE_SECONDS=timeout
+            ):
+                for auction, count in zip(self.auctions * 2, [1, 2, 1, 0]):
+                    url = reverse("listing_view", args=[auction.id])
+                    response = self.client.post(url)
+                    self.assertEqual(response.context["len_watchlist"], count)
+                    response = self.client.get(reverse("index"))
+                    self.assertEqual(response.context["len_watchlist"], count)
+
+
+@unsharded
+class ApiTests(TestCase):
+    """
+    Check the JSON API answers 304 until the auction changes
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.seller = User.objects.create_user("seller", "seller@example.com", "pwd")
+        cls.bidder = User.objects.create_user("bidder", "bidder@example.com", "pwd")
+        cls.auction = Auction.objects.create(
+            title="Laptop", user=cls.seller, duration=Auction.SEVEN, price=10
+        )
+
+    def test_detail(self):
+        url = reverse("api_auction", args=[self.auction.id])
+        response = self.client.get(url)
+        self.assertEqual(response.json()["seller"], "seller")
+        etag = response["ETag"]
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(
+            url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+        )
+        self.assertEqual(response.status_code, 304)
+
+        self.client.force_login(self.bidder)
+        self.client.post(
+            reverse("listing_view", args=[self.auction.id]),
+            {"comment": "", "title": "Question", "content": "Still working?"},
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_edit(self):
+        urls = [
+            reverse("api_auction", args=[self.auction.id]),
+            reverse("api_auctions"),
+        ]
+        etags = [self.client.get(url)["ETag"] for url in urls]
+        Auction.objects.filter(id=self.auction.id).update(title="Gaming laptop")
+        for url, etag in zip(urls, etags):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 200)
+            self.assertContains(response, "Gaming laptop")
+
+    def test_lists(self):
+        Bid.objects.create(auction=self.auction, user=self.bidder, price=20)
+        response = self.client.get(reverse("api_auctions"))
+        self.assertEqual(
+            [row["id"] for row in response.json()["auctions"]], [self.auction.id]
+        )
+        self.assertEqual(
+            self.client.get(
+                reverse("api_auctions"), HTTP_IF_NONE_MATCH=response["ETag"]
+            ).status_code,
+            304,
+        )
+        response = self.client.get(reverse("api_auction_bids", args=[self.auction.id]))
+        self.assertEqual(response.json()["bids"][0]["bidder"], "bidder")
+        response = self.client.get(reverse("api_auction_comments", args=[0]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_states(self):
+        other = Auction.objects.create(
+            title="Phone", user=self.seller, duration=Auction.SEVEN, price=10
+        )
+        Auction.objects.update(creation_date=timezone.now() - timedelta(minutes=1))
+        url = reverse("api_auction_states")
+        ids = f"{self.auction.id},{other.id}"
+        with self.assertNumQueries(1):
+            response = self.client.get(url, {"ids": ids})
+        self.assertEqual(len(response.json()["auctions"]), 2)
+        since = response.json()["since"]
+
+        Auction.objects.filter(id=other.id).update(
+            price=20, last_bid_at=timezone.now() + timedelta(seconds=5)
+        )
+        response = self.client.get(url, {"ids": ids, "since": since})
+        self.assertEqual([row["id"] for row in response.json()["auctions"]], [other.id])
+        response = self.client.get(url, {"ids": "1,x"})
+        self.assertEqual(response.status_code, 400)
+        for since in ("x", "-1" + "0" * 30, "9" * 23):
+            response = self.client.get(url, {"ids": ids, "since": since})
+            self.assertEqual(response.status_code, 400, since)
+
+
+@override_settings(
+    SQLITE_PRAGMAS={"journal_mode": "wal", "busy_timeout": 1234, "synchronous": 1}
+)
+class SqliteConnectionTests(SimpleTestCase):
+    """
+    Check SQLite connections persist under WSGI only and every new one gets
+    the SQLITE_PRAGMAS
+    """
+
+    def test_conn_max_age(self):
+        for mode, age in (("wsgi", 600), ("asgi", 0)):
+            self.assertEqual(conn_max_age(mode), age)
+        self.assertEqual(
+            settings.DATABASES["default"]["CONN_MAX_AGE"],
+            conn_max_age(settings.SERVING_MODE),
+        )
+
+    def test_new_connection(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        default = connections["default"]
+        new_connection = type(default)(
+            {**default.settings_dict, "NAME": os.path.join(directory, "db.sqlite3")}
+        )
+        self.addCleanup(new_connection.close)
+        with new_connection.cursor() as cursor:
+            for name, value in settings.SQLITE_PRAGMAS.items():
+                cursor.execute(f"PRAGMA {name}")
+                self.assertEqual(cursor.fetchone()[0], value, name)
+
+
+@override_settings(AUCTIONS_READ_REPLICAS=["replica"])
+class RouterTests(SimpleTestCase):
+    """
+    Check reads go to the replica unless the browser wrote recently
+    """
+
+    router = PrimaryReplicaRouter()
+
+    def get_response(self, request):
+        request.read_from = self.router.db_for_read(Auction)
+        if request.method == "POST":
+            self.router.db_for_write(Auction)
+        return HttpResponse()
+
+    def test_routing(self):
+        self.assertIsNone(routing.get())
+        self.assertEqual(self.router.db_for_read(Auction), "replica")
+        self.assertEqual(self.router.db_for_write(Auction), "default")
+
+    def test_read_your_writes(self):
+        middleware = ReplicaPinMiddleware(self.get_response)
+        factory = RequestFactory()
+        request = factory.get("/")
+        response = middleware(request)
+        self.assertEqual(request.read_from, "replica")
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        request = factory.post("/")
+        response = middleware(request)
+        self.assertEqual(request.read_from, "default")
+        cookie = response.cookies[PIN_COOKIE]
+
+        factory.cookies[PIN_COOKIE] = cookie.value
+        request = factory.get("/")
+        middleware(request)
+        self.assertEqual(request.read_from, "default")
+        self.assertIsNone(routing.get())
+
+
+@override_settings(AUCTIONS_SHARDS={"home": ["HOU"], "tech": ["IT"]})
+class ShardRouterTests(SimpleTestCase):
+    """
+    Check auctions are placed by category and found back from their id
+    """
+
+    router = ShardRouter()
+
+    def test_shard_for_id(self):
+        self.assertEqual(shard_for_id(1 << 28), "home")
+        self.assertEqual(shard_for_id((2 << 28) + 5), "tech")
+        self.assertIsNone(shard_for_id(5))
+        self.assertIsNone(shard_for_id(3 << 28))
+
+    def test_routing(self):
+        auction = Auction(category=Auction.INFORMATION_TECHNOLOGY)
+        self.assertEqual(self.router.db_for_write(Auction, instance=auction), "tech")
+        self.assertIsNone(self.router.db_for_read(Auction))
+        self.assertIsNone(self.router.db_for_read(User))
+        with use_shard("home"):
+            self.assertEqual(self.router.db_for_read(Bid), "home")
+            self.assertEqual(
+                self.router.db_for_write(Auction, instance=auction), "home"
+            )
+            self.assertIsNone(self.router.db_for_write(User))
+        self.assertTrue(self.router.allow_migrate("tech", "auctions"))
+        self.assertIsNone(self.router.allow_migrate("default", "auctions"))
+
+
+@skipUnless(settings.AUCTIONS_SHARDS, "set COMMERCE_SHARD_DIR to test the shards")
+class ShardTests(TestCase):
+    """
+    Check a category page reads one shard while the index, the search and
+    the state endpoint merge them all, and imports go to the shard of their
+    category
+    """
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("seller", "seller@example.com", "pwd")
+        cls.auctions = [
+            Auction.objects.create(
+                title=category, user=cls.user, duration=duration, category=category
+            )
+            for duration, category in [
+                (Auction.SEVEN, Auction.MUSIC),
+                (Auction.ONE, Auction.INFORMATION_TECHNOLOGY),
+                (Auction.THREE, Auction.HOUSE),
+            ]
+        ]
+
+    def test_placement(self):
+        for auction in self.auctions:
+            shard = shard_for_category(auction.category)
+            self.assertEqual(auction._state.db, shard)
+            self.assertEqual(shard_for_id(auction.id), shard)
+            self.assertTrue(User.objects.using(shard).filter(pk=self.user.pk).exists())
+        self.assertFalse(Auction.objects.using("default").exists())
+
+    def test_index(self):
+        response = self.client.get(reverse("index"))
+        self.assertEqual(
+            [listing.title for listing in response.context["listings"]],
+            [Auction.INFORMATION_TECHNOLOGY, Auction.HOUSE, Auction.MUSIC],
+        )
+
+    def test_categorize(self):
+        shard = shard_for_category(Auction.MUSIC)
+        others = [alias for alias in settings.AUCTIONS_SHARDS if alias != shard]
+        with CaptureQueriesContext(connections[others[0]]) as queries:
+            response = self.client.get(
+                reverse("category_view"), {"select": Auction.MUSIC}
+            )
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(
+            [listing.title for listing in response.context["listings"]], [Auction.MUSIC]
+        )
+        response = self.client.get(reverse("listing_view", args=[self.auctions[0].id]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_search(self):
+        for title, category in [
+            ("Desk lamp", Auction.HOUSE),
+            ("Lamp repair book", Auction.BOOK),
+            ("Lamp cable", Auction.INFORMATION_TECHNOLOGY),
+        ]:
+            Auction.objects.create(
+                title=title, user=self.user, duration=Auction.SEVEN, category=category
+            )
+        first, has_next = search_auctions("lamp", page_size=2)
+        self.assertTrue(has_next)
+        second, has_next = search_auctions("lamp", page=2, page_size=2)
+        self.assertFalse(has_next)
+        titles = {auction.title for auction in first + second}
+        self.assertEqual(titles, {"Desk lamp", "Lamp repair book", "Lamp cable"})
+        self.assertEqual(len(first + second), 3)
+        listings, _ = search_auctions("lamp", category=Auction.BOOK)
+        self.assertEqual([auction.title for auction in listings], ["Lamp repair book"])
+
+    def test_states(self):
+        ids = ",".join(str(auction.id) for auction in self.auctions)
+        response = self.client.get(reverse("api_auction_states"), {"ids": f"{ids},1"})
+        self.assertEqual(
+            sorted(row["id"] for row in response.json()["auctions"]),
+            sorted(auction.id for auction in self.auctions),
+        )
+
+    def test_import(self):
+        rows = [
+            {"seller": seller, "title": title, "category": category, "duration": 7}
+            for seller, title, category in [
+                ("seller", "Guitar", Auction.MUSIC),
+                ("seller", "Sofa", Auction.HOUSE),
+                ("nobody", "Lost", Auction.HOUSE),
+            ]
+        ]
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson", delete=False) as file:
+            file.write("".join(json.dumps(row) + "\n" for row in rows))
+        self.addCleanup(os.remove, file.name)
+        stderr = StringIO()
+        call_command("import_auctions", file.name, stdout=StringIO(), stderr=stderr)
+        self.assertIn("line 3", stderr.getvalue())
+        for title, category in [("Guitar", Auction.MUSIC), ("Sofa", Auction.HOUSE)]:
+            shard = shard_for_category(category)
+            auction = Auction.objects.using(shard).get(title=title)
+            self.assertEqual(shard_for_id(auction.id), shard)
+        self.assertFalse(Auction.objects.using("default").exists())
+
+
+class FakeRedis:
+    """
+    Stand for a Redis server shared by the RedisBroker of several processes
+    """
+
+    def __init__(self):
+        self.channels = {}
+
+    def publish(self, channel, message):
+        for listener in self.channels.get(channel, []):
+            listener.put({"type": "message", "channel": channel, "data": message})
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        server = self
+
+        class PubSub:
+            def subscribe(self, channel):
+                self.messages = queue.Queue()
+                server.channels.setdefault(channel, []).append(self.messages)
+
+            def listen(self):
+                while True:
+                    yield self.messages.get()
+
+        return PubSub()
+
+
+class EventTests(TestCase):
+    """
+    Check events reach the subscribers of an auction once committed, from
+    any process through Redis, and are streamed as Server-Sent Events until
+    the client leaves
+    """
+
+    databases = "__all__"
+
+    def setUp(self):
+        patcher = mock.patch.object(events, "_broker", events.LocalBroker())
+        self.broker = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_broker(self):
+        async def run():
+            queue = self.broker.subscribe(1)
+            other = self.broker.subscribe(2)
+            thread = threading.Thread(
+                target=self.broker.publish, args=(1, "bid", {"price": "20"})
+            )
+            thread.start()
+            thread.join()
+            self.assertEqual(await queue.get(), ("bid", {"price": "20"}))
+            self.assertTrue(other.empty())
+            for i in range(events.QUEUE_SIZE + 1):
+                self.broker.publish(1, "comment", {"number": i})
+            await asyncio.sleep(0)
+            self.assertEqual(queue.qsize(), events.QUEUE_SIZE)
+            self.broker.unsubscribe(1, queue)
+            self.broker.unsubscribe(2, other)
+            self.assertEqual(self.broker.subscribers, {})
+
+        asyncio.run(run())
+
+    def test_publish_on_commit(self):
+        loop = asyncio.new_event_loop()
+        self.addCleanup(loop.close)
+
+        async def subscribe():
+            return self.broker.subscribe(1)
+
+        queue = loop.run_until_complete(subscribe())
+        with self.captureOnCommitCallbacks(execute=True):
+            events.publish(1, "close", {"winner": "bidder"})
+            loop.run_until_complete(asyncio.sleep(0))
+            self.assertTrue(queue.empty())
+        loop.run_until_complete(asyncio.sleep(0))
+        self.assertEqual(queue.get_nowait(), ("close", {"winner": "bidder"}))
+
+    def test_redis_broker(self):
+        server = FakeRedis()
+        publisher = events.RedisBroker(server)
+        listener = events.RedisBroker(server)
+
+        async def run():
+            queue = listener.subscribe(1)
+            while events.REDIS_CHANNEL not in server.channels:
+                await asyncio.sleep(0.01)
+            publisher.publish(1, "close", {"winner": "bidder"})
+            message = await asyncio.wait_for(queue.get(), 5)
+            self.assertEqual(message, ("close", {"winner": "bidder"}))
+            listener.unsubscribe(1, queue)
+
+        asyncio.run(run())
+        self.assertIsNone(publisher.listener)
+        self.assertEqual(listener.subscribers, {})
+
+    def test_live_updates_script(self):
+        user = User.objects.create_user("seller", "seller@example.com", "pwd")
+        auction = Auction.objects.create(
+            title="Laptop", user=user, duration=Auction.SEVEN, price=10
+        )
+        url = reverse("listing_view", args=[auction.id])
+        self.assertNotContains(self.client.get(url), "EventSource(")
+        with self.settings(SERVING_MODE="asgi"):
+            self.assertContains(self.client.get(url), "EventSource(")
+
+    @mock.patch.object(events, "HEARTBEAT", 0.01)
+    def test_stream(self):
+        sent = []
+
+        async def run():
+            leave = asyncio.Event()
+
+            async def receive():
+                await leave.wait()
+                return {"type": "http.disconnect"}
+
+            async def send(message):
+                sent.append(message)
+
+            stream = asyncio.ensure_future(events.stream_events({}, receive, send, 1))
+            while 1 not in self.broker.subscribers:
+                await asyncio.sleep(0)
+            self.broker.publish(1, "bid", {"price": "20"})
+            while len(sent) < 3:
+                await asyncio.sleep(0.01)
+            leave.set()
+            await stream
+
+        asyncio.run(run())
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertIn((b"content-type", b"text/event-stream"), sent[0]["headers"])
+        self.assertEqual(sent[1]["body"], b'event: bid\ndata: {"price": "20"}\n\n')
+        self.assertEqual(sent[2]["body"], b": heartbeat\n\n")
+        self.assertEqual(self.broker.subscribers, {})
+
+
+class MetricsTests(TestCase):
+    """
+    Check /metrics reports the requests of each url name, added up over
+    the worker processes
+    """
+
+    databases = "__all__"
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user("seller", "seller@example.com", "pwd")
+        Auction.objects.create(
+            title="Laptop", user=cls.user, duration=Auction.SEVEN, price=10
+        )
+
+    def get_samples(self):
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(
+            response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8"
+        )
+        return dict(
+            line.rsplit(" ", 1)
+            for line in response.content.decode().splitlines()
+            if not line.startswith("#")
+        )
+
+    def test_views(self):
+        for _ in range(2):
+            self.client.get(reverse("index"))
+        samples = self.get_samples()
+        self.assertGreaterEqual(
+            int(samples['auctions_request_seconds_count{view="index"}']), 2
+        )
+        self.assertGreater(float(samples['auctions_sql_queries_sum{view="index"}']), 0)
+        self.assertGreater(float(samples['auctions_sql_seconds_sum{view="index"}']), 0)
+        self.assertGreater(
+            float(samples['auctions_template_seconds_sum{view="index"}']), 0
+        )
+        self.assertIn("auctions_fragment_cache_hits_total", samples)
+
+    def test_processes(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with override_settings(AUCTIONS_METRICS_DIR=directory):
+            store = MetricStore(["index", OTHER_VIEW])
+            store.observe("index", (0.02, 3, 0.01, 0.005))
+            store.observe("unknown", (2, 0, 0, 0))
+            path = os.path.join(directory, f"{os.getpid()}.metrics")
+            # Another worker, and a file of an older layout
+            shutil.copy(path, os.path.join(directory, "1.metrics"))
+            with open(os.path.join(directory, "2.metrics"), "wb") as stale:
+                stale.write(bytes(64))
+            text = store.render()
+        self.assertIn('auctions_request_seconds_bucket{view="index",le="0.01"} 0', text)
+        self.assertIn(
+            'auctions_request_seconds_bucket{view="index",le="0.025"} 2', text
+        )
+        self.assertIn('auctions_sql_queries_sum{view="index"} 6.0', text)
+        self.assertIn('auctions_request_seconds_count{view="other"} 2', text)
+
+
+@unsharded
+@override_settings(
+    SESSION_ENGINE="django.contrib.sessions.backends.cached_db",
+    AUCTIONS_USER_CACHE_SECONDS=60,
+    AUCTIONS_WATCHLIST_CACHE_SECONDS=3600,
+)
+class ViewPerformanceTests(TestCase):
+    """
+    Query budget and render time of the main views on a seeded catalog
+
+    Every view must stay under its query budget whatever the volume of
+    data. p50/p95 render times are written to PERF_REPORT_PATH
+    """
+
+    USERS = 200
+    AUCTIONS = 1000
+    BIDS = 5000
+    COMMENTS = 2000
+    HOT_COMMENTS = 200
+    WATCHED = 50
+    WON = 30
+    RUNS = 20
+
+    # The session, the user and the watchlist badge are read from the cache,
+    # as with a shared COMMERCE_CACHE_URL
+    QUERY_BUDGETS = {
+        "index": 1,
+        "listing_view": 3,
+        "watchlist": 1,
+        "won": 1,
+        "category_view": 1,
+        "listings_create": 1,
+        # Two of them are the SAVEPOINT and RELEASE of close_auctions()
+        "close_listing": 4,
+    }
+
+    timings = {}
+
+    @classmethod
+    def setUpTestData(cls):
+        random = Random(42)
+        password = make_password("pwd")
+        User.objects.bulk_create(
+            User(username=f"user{i}", password=password) for i in range(cls.USERS)
+        )
+        users = list(User.objects.order_by("id"))
+        cls.seller, cls.bidder = users[0], users[1]
+
+        current = timezone.now()
+        categories = [choice[0] for choice in Auction.CATEGORY_CHOICES]
+        auctions = []
+        for i in range(cls.AUCTIONS):
+            creation_date = current - timedelta(hours=random.randint(0, 24 * 13))
+            duration = random.choice([Auction.SEVEN, Auction.FOURTEEN])
+            auctions.append(
+                Auction(
+                    title=f"Auction {i}",
+                    description="A realistic description " * 5,
+                    creation_date=creation_date,
+                    end_date=Auction.compute_end_date(creation_date, duration),
+                    duration=duration,
+                    category=random.choice(categories),
+                    user=users[0] if i % 10 == 0 else random.choice(users),
+                    price=Decimal("1.00"),
+                )
+            )
+        Auction.objects.bulk_create(auctions)
+        auctions = list(Auction.objects.order_by("id"))
+        cls.hot = auctions[1]
+
+        Bid.objects.bulk_create(
+            Bid(
+                auction=random.choice(auctions),
+                user=random.choice(users[1:]),
+                price=Decimal(i + 2),
+            )
+            for i in range(cls.BIDS)
+        )
+        Comment.objects.bulk_create(
+            Comment(
+                auction=cls.hot if i < cls.HOT_COMMENTS else random.choice(auctions),
+                user=random.choice(users),
+                content="A comment",
+            )
+            for i in range(cls.COMMENTS)
+        )
+        cls.bidder.watchlist.add(*auctions[: cls.WATCHED])
+        won = [
+            auction for auction in auctions[-cls.WON :] if auction.user != cls.seller
+        ]
+        Bid.objects.bulk_create(
+            Bid(auction=auction, user=cls.bidder, price=Decimal(cls.BIDS + 2))
+            for auction in won
+        )
+        Auction.objects.filter(id__in=[auction.id for auction in won]).close()
+        cls.closable = [
+            auction.id
+            for auction in auctions
+            if auction.user_id == cls.seller.id and auction not in won
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        report = {}
+        for name, durations in cls.timings.items():
+            cuts = quantiles(durations, n=100)
+            report[name] = {
+                "runs": len(durations),
+                "p50_ms": round(cuts[49] * 1000, 3),
+                "p95_ms": round(cuts[94] * 1000, 3),
+            }
+        path = os.environ.get("PERF_REPORT_PATH", PERF_REPORT_PATH)
+        with open(path, "w") as report_file:
+            json.dump(report, report_file, indent=2, sort_keys=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+
+    def measure(self, name, request, runs=None):
+        """
+        Run request() several times, check the query budget and keep timings
+        """
+        request()
+        durations = self.timings.setdefault(name, [])
+        for _ in range(runs or self.RUNS):
+            with CaptureQueriesContext(connection) as queries:
+                start = time.perf_counter()
+                response = request()
+                durations.append(time.perf_counter() - start)
+            self.assertLess(response.status_code, 400)
+            self.assertLessEqual(
+                len(queries),
+                self.QUERY_BUDGETS[name],
+                f"{name}: {[query['sql'] for query in queries]}",
+            )
+
+    def test_index(self):
+        self.client.force_login(self.bidder)
+        self.measure("index", lambda: self.client.get(reverse("index")))
+
+    def test_index_skips_sessions(self):
+        url = reverse("index")
+        for login in (False, True):
+            if login:
+                self.client.force_login(self.bidder)
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            tables = " ".join(query["sql"] for query in queries)
+            self.assertNotIn("django_session", tables)
+            self.assertNotIn('FROM "auctions_user"', tables)
+
+    @override_settings(
+        SESSION_ENGINE="django.contrib.sessions.backends.db",
+        AUCTIONS_USER_CACHE_SECONDS=0,
+        AUCTIONS_WATCHLIST_CACHE_SECONDS=0,
+    )
+    def test_index_without_shared_cache(self):
+        self.client.force_login(self.bidder)
+        url = reverse("index")
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            tables = " ".join(query["sql"] for query in queries)
+            self.assertIn("django_session", tables)
+            self.assertIn('FROM "auctions_user"', tables)
+            self.assertIn('FROM "auctions_user_watchlist"', tables)
+            self.assertEqual(response.context["len_watchlist"], self.WATCHED)
+
+    def test_listing_view(self):
+        self.client.force_login(self.bidder)
+        url = reverse("listing_view", args=[self.hot.id])
+        self.measure("listing_view", lambda: self.client.get(url))
+
+    def test_watchlist(self):
+        self.client.force_login(self.bidder)
+        self.measure("watchlist", lambda: self.client.get(reverse("watchlist")))
+
+    def test_won(self):
+        self.client.force_login(self.bidder)
+        response = self.client.get(reverse("won"))
+        listings = response.context["listings"]
+        self.assertTrue(listings)
+        self.assertTrue(all(auction.winner == self.bidder for auction in listings))
+        self.measure("won", lambda: self.client.get(reverse("won")))
+
+    def test_category_view(self):
+        self.client.force_login(self.bidder)
+        url = reverse("category_view")
+        self.measure(
+            "category_view",
+            lambda: self.client.get(url, {"select": Auction.INFORMATION_TECHNOLOGY}),
+        )
+        for query in ({"select": "XXX"}, {}):
+            self.assertEqual(self.client.get(url, query).status_code, 404)
+
+    def test_create(self):
+        self.client.force_login(self.seller)
+        url = reverse("listings_create")
+        data = {
+            "title": "New auction",
+            "description": "Description",
+            "image": "https://example.com/image.png",
+            "category": Auction.BOOK,
+            "duration": Auction.SEVEN,
+            "price": "10",
+        }
+        self.measure("listings_create", lambda: self.client.post(url, data))
+
+    def test_close_auction(self):
+        self.client.force_login(self.seller)
+        urls = iter(
+            reverse("close_listing", args=[auction_id])
+            for auction_id in self.closable
+        )
+        runs = min(self.RUNS, len(self.closable) - 1)
+        self.measure("close_listing", lambda: self.client.post(next(urls)), runs)
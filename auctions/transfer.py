@@ -0,0 +1,129 @@
+import csv
+import json
+import sys
+from contextlib import contextmanager
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+FORMATS = ("ndjson", "csv")
+
+# Columns read by import_auctions, the seller being a username
+IMPORT_FIELDS = (
+    "title",
+    "description",
+    "image",
+    "category",
+    "duration",
+    "price",
+    "creation_date",
+)
+
+# Columns written by export_auctions, a superset of IMPORT_FIELDS
+EXPORT_FIELDS = (
+    "id",
+    "seller",
+    *IMPORT_FIELDS,
+    "end_date",
+    "status",
+    "bid_count",
+    "winner_name",
+)
+
+
+def guess_format(path, fmt=None):
+    """
+    Return the format of a file, fmt if given else from its extension
+
+    Parameters
+    ----------
+    path: str
+        Path of the file, "-" for stdin or stdout
+    fmt: str
+        One of FORMATS or None
+
+    Return
+    ------
+    fmt: str
+        "csv" for a .csv file, "ndjson" otherwise
+    """
+    if fmt:
+        return fmt
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+@contextmanager
+def open_stream(path, mode):
+    """
+    Open path as text, "-" being stdin or stdout
+    """
+    if path == "-":
+        yield sys.stdin if mode == "r" else sys.stdout
+    else:
+        with open(path, mode, encoding="utf-8", newline="") as stream:
+            yield stream
+
+
+def read_rows(stream, fmt):
+    """
+    Yield the rows of stream one at a time
+
+    Parameters
+    ----------
+    stream: file
+        A text file
+    fmt: str
+        One of FORMATS
+
+    Return
+    ------
+    rows: generator
+        (line number, dict) tuples, a malformed NDJSON line giving None
+    """
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for number, line in enumerate(stream, 1):
+        if line.strip():
+            try:
+                row = json.loads(line)
+            except ValueError:
+                row = None
+            yield number, row if isinstance(row, dict) else None
+
+
+class RowWriter:
+    """
+    A class used to write rows to a stream in one of FORMATS
+
+    ...
+
+    Attributes
+    ----------
+    stream: file
+        The text file written
+    fmt: str
+        One of FORMATS
+    fields: tuple
+        The columns, in order
+
+    Methods
+    -------
+    write(row):
+        Write a dict with the fields as keys
+    """
+
+    def __init__(self, stream, fmt, fields):
+        self.stream = stream
+        self.fmt = fmt
+        self.fields = fields
+        if fmt == "csv":
+            self.writer = csv.DictWriter(stream, fields)
+            self.writer.writeheader()
+
+    def write(self, row):
+        if self.fmt == "csv":
+            self.writer.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, cls=DjangoJSONEncoder) + "\n")
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 urlpatterns = [
     path("", views.index, name="index"),
@@ -11,5 +11,20 @@ urlpatterns = [
     path("listings/<int:listing_id>", views.get_listing, name="listing_view"),
     path("listings/<int:auction_id>/close", views.close_auction, name="close_listing"),
     path("watchlist/", views.watchlist, name="watchlist"),
+    path("won/", views.won, name="won"),
     path("category/", views.categorize, name="category_view"),
+    path("search", views.search, name="search"),
+    path("search/suggest", views.suggest, name="suggest"),
+    path("metrics", views.metrics, name="metrics"),
+    path("api/auctions", api.auction_list, name="api_auctions"),
+    path("api/auctions/state", api.auction_states, name="api_auction_states"),
+    path("api/auctions/<int:auction_id>", api.auction_detail, name="api_auction"),
+    path(
+        "api/auctions/<int:auction_id>/bids", api.auction_bids, name="api_auction_bids"
+    ),
+    path(
+        "api/auctions/<int:auction_id>/comments",
+        api.auction_comments,
+        name="api_auction_comments",
+    ),
 ]
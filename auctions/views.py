@@ -1,20 +1,30 @@
 from decimal import *
 
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
-from django.db import IntegrityError
-from django.http import HttpResponse, HttpResponseRedirect
-from django.shortcuts import render
+from django.db import IntegrityError, router, transaction
+from django.db.models import F
+from django.http import Http404, HttpResponse, HttpResponseRedirect, JsonResponse
+from django.shortcuts import get_object_or_404, render
 from django.urls import reverse
 from django.utils import timezone
 
 from .models import User, Auction
+from .autocomplete import title_index
+from .cache import change_watchlist_count
+from .events import publish
+from .expiry import close_auctions
 from .forms import *
+from .metrics import PROMETHEUS_CONTENT_TYPE, render_metrics
+from .pagination import paginate
+from .search import search_auctions
+from .shards import shard_querysets
 
 
 def index(request):
     """
-    Update rest time of each auction and render the webpage with all active auctions
+    Render one page of active auctions, the ones ending first come first
 
     Parameters
     ----------
@@ -26,25 +36,45 @@ def index(request):
     render():
         The rendering of the index webpage
     """
-    for auction in Auction.objects.all():
-        update_auction_time(auction)
-    try:
-        user = User.objects.get(username=request.user)
-    except:
-        watchlist = 0
-    else:
-        watchlist = len(user.watchlist.all())
+    listings, cursor = paginate(
+        Auction.objects.active().select_related("user"), request.GET.get("after")
+    )
     return render(
         request,
         "auctions/index.html",
         {
-            "listings": Auction.objects.all(),
+            "listings": listings,
+            "next_page": next_page_query(request, cursor),
             "category_form": CategoryForm(),
-            "len_watchlist": watchlist,
         },
     )
 
 
+def next_page_query(request, cursor):
+    """
+    Build the query string of the next page
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request
+    cursor: str
+        Cursor returned by paginate()
+
+    Return
+    ------
+    None: NoneType
+        if there is no next page
+    query: str
+        The current query string with after set to cursor
+    """
+    if cursor is None:
+        return None
+    query = request.GET.copy()
+    query["after"] = cursor
+    return query.urlencode()
+
+
 def login_view(request):
     """
     Check if user is an authentic user 
@@ -155,10 +185,9 @@ def create(request):
     render():
         The rendering of the index webpage
     """
-    user = User.objects.get(username=request.user)
     if request.method == "POST":
         form = CreateListingsForm(request.POST)
-        form.instance.user = user
+        form.instance.user = request.user
         form.instance.creation_date = timezone.now()
         if form.is_valid():
             form.save()
@@ -167,14 +196,11 @@ def create(request):
             form = CreateListingsForm()
             return render(request, "auctions/listings.html", {
                 "form": form,
-                "len_watchlist": len(user.watchlist.all()),
-
             })
     else:
         form = CreateListingsForm()
         return render(request, "auctions/listings.html", {
             "form": form,
-            "len_watchlist": len(user.watchlist.all()),
         })
 
 
@@ -195,43 +221,38 @@ def get_listing(request, listing_id):
     render():
         The rendering of the current_listing webpage
     """
-    auction = Auction.objects.get(pk=listing_id)
-    update_auction_time(auction)
+    auction = get_object_or_404(
+        Auction.objects.select_related("user", "winner"), pk=listing_id
+    )
+    user = request.user
+    button_text = ""
+    message = True
 
-    try:
-        user = User.objects.get(username=request.user)
-    except User.DoesNotExist:
-        user = request.user
-        button_text = ""
-    else:
+    if user.is_authenticated:
         if is_in_watchlist(auction, user):
             button_text = "Remove from Watchlist"
         else:
             button_text = "Add to Watchlist"
 
-    message = True
-
-    if request.method == "POST":
-        if "bid" in request.POST:
-            message = is_valid_bid(request, auction, user)
-        elif "comment" in request.POST:
-            message = is_valid_comment(request, auction, user)
-        else:
-            button_text, message = modify_watchlist(auction, user)
-    print(auction.image, type(auction.image))
+        if request.method == "POST":
+            if "bid" in request.POST:
+                message = is_valid_bid(request, auction, user)
+            elif "comment" in request.POST:
+                message = is_valid_comment(request, auction, user)
+            else:
+                button_text, message = modify_watchlist(auction, user)
     return render(
         request,
         "auctions/current_listing.html",
         {
             "auction": auction,
-            "user": user,
-            "users": User.objects.all(),
+            # The event stream is only served by commerce/asgi.py
+            "live_updates": settings.SERVING_MODE == "asgi",
             "bid_form": BidForm(),
             "comment_form": CommentForm(),
             "message": message,
             "watchlist_text": button_text,
-            "comments": auction.comments.all(),
-            "len_watchlist": len(user.watchlist.all()),
+            "comments": auction.comments.select_related("user").order_by("date"),
             "image": auction.image,
         },
     )
@@ -258,33 +279,64 @@ def is_valid_bid(request, auction, user):
         if not
     """
     new_price = Decimal(request.POST["price"])
-    if new_price > auction.price:
-        place_bid(new_price, auction, user)
-        return True
-    return False
+    return place_bid(new_price, auction, user)
 
 
 def place_bid(price, auction, user):
     """
-    Update the price of the auction
+    Update the price of the auction if price is higher than the current one
+
+    The comparison and the update are done by a single conditional UPDATE,
+    so two concurrent bids can not both win and only the bid columns are written
 
     Parameters
     ----------
-    request: WSGIRequest
-        Represent the browser request
+    price: Decimal
+        The amount of the bid
     auction: Auction
         Represent an Auction object
     user: User
         Represent a User object
 
-    """
-    auction.price = price
-    bid = Bid.objects.create(
-        auction=auction, user=user, auction_date=timezone.now(), price=auction.price
+    Return
+    ------
+    True: boolean
+        if the bid has been placed
+    False: boolean
+        if the price is not higher or the auction is not active
+    """
+    current = timezone.now()
+    using = router.db_for_write(Auction, instance=auction)
+    with transaction.atomic(using=using):
+        updated = (
+            Auction.objects.using(using)
+            .active(current)
+            .filter(pk=auction.pk, price__lt=price)
+            .update(
+                price=price,
+                bid_count=F("bid_count") + 1,
+                high_bidder=user,
+                last_bid_at=current,
+            )
+        )
+        if not updated:
+            return False
+        Bid.objects.using(using).create(
+            auction=auction, user=user, auction_date=current, price=price
+        )
+    auction.refresh_from_db(
+        fields=["price", "bid_count", "high_bidder", "last_bid_at"]
+    )
+    publish(
+        auction.id,
+        "bid",
+        {
+            "price": str(auction.price),
+            "bid_count": auction.bid_count,
+            "high_bidder_id": auction.high_bidder_id,
+        },
     )
-    bid.save()
-    auction.bids.add(bid)
-    auction.save()
+    return True
 
 
 def is_in_watchlist(auction, user):
@@ -305,11 +357,7 @@ def is_in_watchlist(auction, user):
     False: boolean
         if not
     """
-    watchlist = user.watchlist
-    if auction in user.watchlist.all():
-        return True
-    else:
-        return False
+    return user.watchlist.filter(pk=auction.pk).exists()
 
 
 def modify_watchlist(auction, user):
@@ -334,11 +382,11 @@ def modify_watchlist(auction, user):
     statement = is_in_watchlist(auction, user)
     if statement:
         user.watchlist.remove(auction)
-        user.save()
+        change_watchlist_count(user.id, -1)
         return "Add from Watchlist", True
     elif not statement:
         user.watchlist.add(auction)
-        user.save()
+        change_watchlist_count(user.id, 1)
         return "Remove from Watchlist", True
     return "Error! Reload page", False
 
@@ -376,9 +424,17 @@ def is_valid_comment(request, auction, user):
     except:
         return False
     else:
-        new_comment.save()
-        auction.comments.add(new_comment)
-        auction.save()
+        Auction.objects.filter(id=auction.id).update(last_comment_at=timezone.now())
+        publish(
+            auction.id,
+            "comment",
+            {
+                "title": new_comment.title,
+                "user": user.username,
+                "date": str(new_comment.date),
+                "content": new_comment.content,
+            },
+        )
         return True
 
 
@@ -397,57 +453,50 @@ def watchlist(request):
     render(): 
         Rendering of watchlist webpage
     """
-    user = User.objects.get(username=request.user)
-    for auction in user.watchlist.all():
-        update_auction_time(auction)
+    user = request.user
+    watchlist = [
+        auction
+        for queryset in shard_querysets(user.watchlist.active().select_related("user"))
+        for auction in queryset
+    ]
     return render(
         request,
         "auctions/watchlist.html",
         {
-            "watchlist": user.watchlist.all(),
+            "watchlist": watchlist,
             "username": user.username.capitalize(),
-            "len_watchlist": len(user.watchlist.all()),
         },
     )
 
 
-def update_auction_time(auction):
-    """
-    Update rest time of an auction
-
-    Parameters
-    ----------
-    auction: Auction
-        Represent an Auction object
+@login_required
+def won(request):
     """
-    if not auction.update_remaining_time(timezone.now()):
-        bid = search_bid(auction)
-        auction.update_winner(bid)
-    auction.save()
+    Render one page of the auctions won by the user
 
-
-def search_bid(auction):
-    """
-    Check if the bid exist
+    The auctions are found with the index of Auction.winner
 
     Parameters
     ----------
-    auction: Auction
-        Represent an Auction object
+    request: WSGIRequest
+        Represent the browser request
 
     Return
     ------
-    None: NoneType
-        if the bid not exist
-    bid: Bid
-        if bid exist
+    render():
+        Rendering of won webpage
     """
-    try:
-        bid = Bid.objects.get(auction=auction, price=auction.price)
-    except Bid.DoesNotExist:
-        return None
-    else:
-        return bid
+    listings, cursor = paginate(
+        request.user.won.select_related("user", "winner"), request.GET.get("after")
+    )
+    return render(
+        request,
+        "auctions/won.html",
+        {
+            "listings": listings,
+            "next_page": next_page_query(request, cursor),
+        },
+    )
 
 
 @login_required
@@ -468,19 +517,15 @@ def close_auction(request, auction_id):
         Redirect to index webpage
 
     """
-    auction = Auction.objects.get(id=auction_id)
-    auction.status = False
-    bid = search_bid(auction)
-    if bid != None:
-        auction.winner = auction.update_winner(bid)
-    auction.remaining = "Ended"
-    auction.save()
+    close_auctions([auction_id])
     return HttpResponseRedirect((reverse("index")))
 
 
 def categorize(request):
     """
-    Render all auctions append to a specific category
+    Render one page of the active auctions append to a specific category
+
+    A missing or unknown category gives a 404
 
     Parameters
     ----------
@@ -491,20 +536,104 @@ def categorize(request):
     ------
     render():
         Rendering of category_listing webpage
-
     """
-    category_filter = request.GET["select"]
-    for i in range(len(Auction.CATEGORY_CHOICES)):
-        if Auction.CATEGORY_CHOICES[i][0] == category_filter:
-            category_index = i
-    listings = Auction.objects.filter(category=category_filter)
-    user = User.objects.get(username=request.user)
+    category_filter = request.GET.get("select")
+    category_name = dict(Auction.CATEGORY_CHOICES).get(category_filter)
+    if category_name is None:
+        raise Http404("No such category.")
+    queryset = Auction.objects.active().filter(category=category_filter)
+    listings, cursor = paginate(
+        queryset.select_related("user"), request.GET.get("after")
+    )
     return render(
         request,
         "auctions/category_listing.html",
         {
             "listings": listings,
-            "category": Auction.CATEGORY_CHOICES[category_index][1],
-            "len_watchlist": len(user.watchlist.all()),
+            "next_page": next_page_query(request, cursor),
+            "category": category_name,
         }
-    )
\ No newline at end of file
+    )
+
+
+def search(request):
+    """
+    Render one page of the auctions matching the searched words
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request
+
+    Return
+    ------
+    render():
+        Rendering of search webpage
+    """
+    form = SearchForm(request.GET or None)
+    listings, has_next = [], False
+    page = 1
+    if form.is_valid():
+        page = form.cleaned_data["page"] or 1
+        listings, has_next = search_auctions(
+            form.cleaned_data["q"],
+            category=form.cleaned_data["category"] or None,
+            active_only=not form.cleaned_data["all"],
+            page=page,
+        )
+    query = request.GET.copy()
+    query["page"] = page + 1
+    return render(
+        request,
+        "auctions/search.html",
+        {
+            "form": form,
+            "listings": listings,
+            "next_page": query.urlencode() if has_next else None,
+        },
+    )
+
+
+def suggest(request):
+    """
+    Return titles of active auctions matching what the user is typing
+
+    Suggestions come from the in-memory title index, the database is only
+    queried when the index is loaded or reloaded
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request, q holding the typed text
+
+    Return
+    ------
+    JsonResponse(): JsonResponse
+        suggestions: list of {"id", "title"} objects
+    """
+    suggestions = title_index.suggest(request.GET.get("q", "")[:100])
+    return JsonResponse(
+        {
+            "suggestions": [
+                {"id": auction_id, "title": title} for auction_id, title in suggestions
+            ]
+        }
+    )
+
+
+def metrics(request):
+    """
+    Return the request metrics in the Prometheus text format
+
+    Parameters
+    ----------
+    request: WSGIRequest
+        Represent the browser request
+
+    Return
+    ------
+    HttpResponse(): HttpResponse
+        Histograms of wall time, SQL queries, SQL time and template render
+        time per url name, and the fragment cache counters
+    """
+    return HttpResponse(render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -2,6 +2,8 @@
 ASGI config for commerce project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+Requests to /listings/<id>/events are answered by a Server-Sent Events stream
+of the auction's bids, comments and closure, everything else goes to Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/3.0/howto/deployment/asgi/
@@ -12,5 +14,18 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "commerce.settings")
+os.environ.setdefault("COMMERCE_SERVING_MODE", "asgi")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from auctions.events import EVENTS_PATH, stream_events  # noqa: E402
+
+
+async def application(scope, receive, send):
+    if scope["type"] == "http" and scope["method"] == "GET":
+        match = EVENTS_PATH.match(scope["path"])
+        if match:
+            return await stream_events(
+                scope, receive, send, int(match.group("auction_id"))
+            )
+    return await django_application(scope, receive, send)
@@ -41,7 +41,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "auctions.middleware.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
+    "auctions.middleware.ReplicaPinMiddleware",
+    "auctions.middleware.ShardMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -54,7 +57,8 @@ ROOT_URLCONF = "commerce.urls"
 
 TEMPLATES = [
     {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
+        # DjangoTemplates measuring the render time for MetricsMiddleware
+        "BACKEND": "auctions.metrics.TimedDjangoTemplates",
         "DIRS": [],
         "APP_DIRS": True,
         "OPTIONS": {
@@ -63,6 +67,7 @@ TEMPLATES = [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "auctions.context_processors.watchlist",
             ],
         },
     },
@@ -74,15 +79,121 @@ WSGI_APPLICATION = "commerce.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/3.0/ref/settings/#databases
 
+# Server running the project, "asgi" when loaded by commerce/asgi.py
+SERVING_MODE = os.environ.get("COMMERCE_SERVING_MODE", "wsgi")
+
+
+def conn_max_age(serving_mode):
+    """
+    Return the CONN_MAX_AGE of the default database under a serving mode
+
+    Under WSGI each worker thread keeps its connection between requests,
+    checked before being reused. Under ASGI requests hop between the
+    threads of a pool, connections are closed at the end of each one
+    """
+    return 0 if serving_mode == "asgi" else 600
+
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": os.path.join(BASE_DIR, "db.sqlite3"),
+        "CONN_MAX_AGE": conn_max_age(SERVING_MODE),
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
+# PRAGMAs run on every new SQLite connection by auctions.signals.
+# WAL lets readers and one writer work at the same time, a writer waits
+# busy_timeout ms for the lock instead of failing with "database is
+# locked". Compare with the default journal using benchmark_sqlite
+SQLITE_PRAGMAS = {
+    "journal_mode": "wal",
+    "synchronous": "normal",
+    "busy_timeout": 5000,
+    "cache_size": -64000,
+    "mmap_size": 256 * 1024 * 1024,
+    "temp_store": "memory",
+}
+
+# Read replica, a copy of the primary refreshed by manage.py sync_replica,
+# used when COMMERCE_REPLICA_PATH is set. auctions.routers sends reads to
+# AUCTIONS_READ_REPLICAS, except for AUCTIONS_REPLICA_PIN_SECONDS after a
+# write of the same browser
+if os.environ.get("COMMERCE_REPLICA_PATH"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "NAME": os.environ["COMMERCE_REPLICA_PATH"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+AUCTIONS_READ_REPLICAS = [alias for alias in DATABASES if alias != "default"]
+
+# Category sharding, used when COMMERCE_SHARD_DIR is set. The auctions of
+# each group of categories, with their bids, comments and watchlist rows,
+# live in the SQLite file <alias>.sqlite3 of that directory. Users stay in
+# the default database and are copied to every shard. Create the shards
+# with manage.py init_shards
+AUCTIONS_SHARDS = {}
+if os.environ.get("COMMERCE_SHARD_DIR"):
+    AUCTIONS_SHARDS = {
+        "home": ["HOU", "PPT", "MOT"],
+        "leisure": ["HOB", "MUS", "BOK"],
+        "tech": ["IT"],
+    }
+    for alias in AUCTIONS_SHARDS:
+        DATABASES[alias] = {
+            **DATABASES["default"],
+            "NAME": os.path.join(os.environ["COMMERCE_SHARD_DIR"], f"{alias}.sqlite3"),
+        }
+
+DATABASE_ROUTERS = [
+    "auctions.routers.ShardRouter",
+    "auctions.routers.PrimaryReplicaRouter",
+]
+
+AUCTIONS_REPLICA_PIN_SECONDS = 5
+
 AUTH_USER_MODEL = "auctions.User"
 
+# Cache shared by the worker processes, a Redis server set by
+# COMMERCE_CACHE_URL such as redis://127.0.0.1:6379 (pip install redis).
+# Without it each process keeps its own cache in memory, which the cached
+# sessions and users below are not used with since a change made through one
+# process would not be seen by the others
+shared_cache = bool(os.environ.get("COMMERCE_CACHE_URL"))
+if shared_cache:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.environ["COMMERCE_CACHE_URL"],
+        }
+    }
+
+# CachedModelBackend reads the user of a session from the cache, kept
+# AUCTIONS_USER_CACHE_SECONDS, 0 to read it from the database like
+# ModelBackend. ModelBackend still accepts the sessions opened before
+# CachedModelBackend was added
+AUTHENTICATION_BACKENDS = [
+    "auctions.backends.CachedModelBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
+AUCTIONS_USER_CACHE_SECONDS = 60 if shared_cache else 0
+
+# The watchlist badge reads a per-user counter from the cache, kept
+# AUCTIONS_WATCHLIST_CACHE_SECONDS and updated when an auction is added or
+# removed, 0 to count the watchlist in SQL on every request
+AUCTIONS_WATCHLIST_CACHE_SECONDS = 60 * 60 if shared_cache else 0
+
+# Session storage set by COMMERCE_SESSION_MODE: "cached_db" reads sessions
+# from the cache and writes them through to the database, "signed_cookies"
+# keeps them in the browser, "db" reads the database on every request.
+# "cached_db" by default with a shared cache, "db" otherwise
+SESSION_ENGINE = "django.contrib.sessions.backends." + os.environ.get(
+    "COMMERCE_SESSION_MODE", "cached_db" if shared_cache else "db"
+)
+
 DEFAULT_AUTO_FIELD = "django.db.models.AutoField"
 
 # Password validation
@@ -122,3 +233,33 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/3.0/howto/static-files/
 
 STATIC_URL = "/static/"
+
+
+# Title suggestions
+# Seconds between two reads of the index of active titles of each process by
+# a background thread, picking up the auctions created or closed by other
+# processes
+
+AUCTIONS_SUGGEST_RELOAD_SECONDS = 60
+
+
+# Live auction events
+# Dotted path of the broker fanning out bids, comments and closures to the
+# Server-Sent Events streams served by commerce/asgi.py. With a shared cache
+# RedisBroker sends them through its Redis server to every process, the
+# closures made by manage.py expire_auctions included. LocalBroker only
+# reaches the streams of the process publishing the event, the others show
+# them once their page is reloaded
+
+AUCTIONS_EVENT_BROKER = "auctions.events." + (
+    "RedisBroker" if shared_cache else "LocalBroker"
+)
+
+
+# Request metrics
+# Histograms of MetricsMiddleware served at /metrics in the Prometheus text
+# format. With COMMERCE_METRICS_DIR each worker process maps its histograms
+# to a file of that directory and /metrics adds up the files of all workers,
+# otherwise only the process answering /metrics is seen
+
+AUCTIONS_METRICS_DIR = os.environ.get("COMMERCE_METRICS_DIR")
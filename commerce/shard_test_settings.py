@@ -0,0 +1,14 @@
+"""
+Settings running the test suite with category sharding
+
+    python manage.py test auctions --settings=commerce.shard_test_settings
+
+The shard aliases of AUCTIONS_SHARDS are declared as with COMMERCE_SHARD_DIR,
+their test databases being created in memory like the default one
+"""
+import os
+import tempfile
+
+os.environ.setdefault("COMMERCE_SHARD_DIR", tempfile.gettempdir())
+
+from .settings import *  # noqa: E402,F401,F403
@@ -12,5 +12,6 @@ import os
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "commerce.settings")
+os.environ.setdefault("COMMERCE_SERVING_MODE", "wsgi")
 
 application = get_wsgi_application()